@@ -1,2 +1,26 @@
-from .cnf import Encoding, encode
-from .sudoku import decode
\ No newline at end of file
+import importlib
+
+# the public functions are imported from their modules on first use, so
+# that e.g. sud2sat doesn't pay for importing the native solver.
+__LAZY = {
+    "Encoding": "cnf",
+    "encode": "cnf",
+    "encode_to": "cnf",
+    "count": "solver",
+    "solve": "solver",
+    "decode": "sudoku",
+}
+
+__all__ = list(__LAZY)
+
+
+def __getattr__(name: str):
+    if name not in __LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{__LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from .daemon import DEFAULT_PORT
+
+# Client for the satcoder daemon. Reads puzzles, one per line, from a file
+# or stdin, sends them all to the daemon over one connection, and prints
+# the results in the same order as the puzzles.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send puzzles to the satcoder daemon")
+    args = setup_args(parser)
+
+    with open(args.file, "r") if args.file else sys.stdin as f:
+        puzzles = [line.strip() for line in f if line.strip()]
+
+    try:
+        responses = asyncio.run(request_all(args, puzzles))
+    except (ConnectionError, FileNotFoundError) as e:
+        print(f"Error: could not connect to the daemon: {e}")
+        exit(1)
+
+    failed = False
+    for response in responses:
+        if "error" in response:
+            failed = True
+            print(f"Error: {response['error']}", file=sys.stderr)
+            continue
+        line = response["result"]
+        if args.timing:
+            line += " " + json.dumps(response["timing"])
+        print(line)
+    if failed:
+        exit(1)
+
+
+def setup_args(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    parser.add_argument(
+        "file", nargs="?", default="", help="puzzle file, read from stdin if not given"
+    )
+    parser.add_argument(
+        "-u", "--socket", default="", help="connect to this Unix socket instead of TCP"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="daemon address")
+    parser.add_argument(
+        "-p", "--port", type=int, default=DEFAULT_PORT, help="daemon TCP port"
+    )
+    parser.add_argument(
+        "-e",
+        "--enc",
+        default="",
+        help="return the CNF in this encoding, instead of solving the puzzles",
+    )
+    parser.add_argument(
+        "-t", "--timing", action="store_true", help="print the timing of each puzzle"
+    )
+    return parser.parse_args()
+
+
+# sends every puzzle, and returns the responses in the order of puzzles
+async def request_all(args: argparse.Namespace, puzzles: list) -> list:
+    if args.socket:
+        reader, writer = await asyncio.open_unix_connection(args.socket, limit=1 << 24)
+    else:
+        reader, writer = await asyncio.open_connection(
+            args.host, args.port, limit=1 << 24
+        )
+
+    async def send() -> None:
+        for i, puzzle in enumerate(puzzles):
+            request = {"id": i, "op": "solve", "puzzle": puzzle}
+            if args.enc:
+                request.update(op="encode", encoding=args.enc)
+            writer.write((json.dumps(request) + "\n").encode())
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    responses = [{}] * len(puzzles)
+    for _ in puzzles:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        response = json.loads(line)
+        responses[response["id"]] = response
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import itertools
 import os
 import re
 from enum import Enum
-from typing import Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 # sudoku puzzles can be encoded into CNF in 3 different ways,
@@ -17,15 +17,140 @@ class Encoding(Enum):
     EXTENDED = 2
 
 
-# given a sudoku string,
-# returns the CNF encoding of the sudoku as a string
+# every encoding uses one variable per (row, column, value),
+# and a fixed number of clauses before the puzzle's clues are added.
+VARIABLES = 729
+CLAUSES = {
+    Encoding.MINIMAL: 8829,
+    Encoding.EFFICIENT: 11745,
+    Encoding.EXTENDED: 11988,
+}
+
+# the comment a CNF in a seeded layout starts with, followed by the seed
+SEED_COMMENT = "c seed"
+
+# size of the chunks encode_to writes at a time
+CHUNK_SIZE = 1 << 16
+
+# the fixed CNF of every encoding is prebuilt and shipped in satcoder/data,
+# so it doesn't have to be built in Python the first time it's used.
+# Rebuild the files with `python -m satcoder.cnf` if the clauses change.
+DATA_DIR = "data"
+
+
+# given a sudoku string (or a sequence of 81 cell values, like
+# the rows returned by puzzles.load), returns the CNF encoding
+# of the sudoku as a string
 # these string are VERY large, as CNF is a very verbose format
 # if cache is not None, the fixed CNF will be written to a file
 # in that directory, and reused if it already exists.
-def encode(sudoku: str, encoding=Encoding.MINIMAL, cache=None) -> str:
+# if seed is not None, the clauses, literals and variables are shuffled
+# into the layout for that seed (see layout.py), decode with the same seed.
+def encode(sudoku, encoding=Encoding.MINIMAL, cache=None, seed=None) -> str:
     # parse the sudoku string
     sudoku_list, count = __parse(sudoku)
-    return __create_cnf(sudoku_list, count, encoding, cache)
+    rule_base = rules(encoding, cache)
+    if seed is not None:
+        return __seed_comment(seed) + rule_base.header(count) + "".join(
+            __layout(seed).clauses(rule_base, sudoku_list)
+        )
+    clues = "".join(f"{clue} 0\n" for clue in sudoku_list)
+    return rule_base.header(count) + rule_base.cnf.decode() + clues
+
+
+# same as encode, but writes the CNF to out, which is either a binary
+# file object or a file descriptor, in chunks of at most CHUNK_SIZE bytes.
+# The header is computed from the clause counts up front, so the CNF is
+# never held in memory more than once per process (see RuleBase).
+def encode_to(out, sudoku, encoding=Encoding.MINIMAL, cache=None, seed=None) -> None:
+    sudoku_list, count = __parse(sudoku)
+    rule_base = rules(encoding, cache)
+    write = __writer(out)
+
+    if seed is not None:
+        write((__seed_comment(seed) + rule_base.header(count)).encode())
+        __write_lines(write, __layout(seed).clauses(rule_base, sudoku_list))
+        return
+    write(rule_base.header(count).encode())
+    view = memoryview(rule_base.cnf)
+    for i in range(0, len(view), CHUNK_SIZE):
+        write(view[i : i + CHUNK_SIZE])
+    __write_lines(write, (f"{clue} 0\n" for clue in sudoku_list))
+
+
+# The fixed part of an encoding, the rules of sudoku, is the same for every
+# puzzle. A RuleBase holds it in memory, so it is only built (or read from
+# the cache) once per process, and every puzzle encoded afterwards only
+# adds its clues, as unit clauses, on top of the same rules.
+class RuleBase:
+    def __init__(self, encoding: Encoding, cnf: bytes) -> None:
+        self.encoding = encoding
+        self.clauses = CLAUSES[encoding]
+        self.cnf = cnf
+
+    # header of the CNF once count clues are added to the rules
+    def header(self, count: int) -> str:
+        return f"p cnf {VARIABLES} {self.clauses + count}\n"
+
+
+__RULES: Dict[Tuple[Encoding, Optional[str]], RuleBase] = {}
+
+
+# returns the RuleBase for encoding, loading it the first time it is
+# asked for in this process. If cache is given, the rules are read from
+# (or written to) a file in that directory, as with encode.
+def rules(encoding=Encoding.MINIMAL, cache=None) -> RuleBase:
+    key = (encoding, cache or None)
+    if key not in __RULES:
+        if cache:
+            with open(__cache_file(encoding, cache), "rb") as sudoku_rules:
+                # skip the header of the cached file
+                sudoku_rules.readline()
+                cnf = sudoku_rules.read()
+        else:
+            cnf = __fixed_cnf(encoding)
+        __RULES[key] = RuleBase(encoding, cnf)
+    return __RULES[key]
+
+
+# a shuffled CNF starts with a comment giving its seed, which solvers
+# ignore, so tools that need the layout (like satmark's stand-in solver)
+# can find it
+def __seed_comment(seed: int) -> str:
+    return f"{SEED_COMMENT} {seed}\n"
+
+
+# layout.py imports this module, so it is imported on first use
+def __layout(seed: int):
+    from .layout import layout
+
+    return layout(seed)
+
+
+# returns a function that writes all of a bytes object to out
+def __writer(out) -> Callable[[bytes], None]:
+    if not isinstance(out, int):
+        return out.write
+
+    def write(data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(out, view) :]
+
+    return write
+
+
+# buffer lines until they fill a chunk, then write them out
+def __write_lines(write: Callable[[bytes], None], lines: Iterable[str]) -> None:
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            write("".join(buffer).encode())
+            buffer, size = [], 0
+    if buffer:
+        write("".join(buffer).encode())
 
 
 def __getSeparator(sudoku: str) -> str:
@@ -39,21 +164,40 @@ def __getSeparator(sudoku: str) -> str:
     )
 
 
-def __parse(sudoku: str) -> Tuple[list, int]:
-    separator, count, sudoku_list = "", 0, []
+def __parse(sudoku) -> Tuple[list, int]:
+    count, sudoku_list = 0, []
+    grid = cells(sudoku) if isinstance(sudoku, str) else sudoku
+    if not isinstance(sudoku, str):
+        __check_cells(len(grid))
+
+    for i, cell in enumerate(grid):
+        if cell:
+            sudoku_list.append(__enc(i // 9 + 1, i % 9 + 1, cell))
+            count += 1
 
-    # strip newlines
+    return (sudoku_list, count)
+
+
+# the clues of a sudoku (a string, or 81 cell values) as the literals of
+# their variables, the unit clauses encode adds to the rules
+def clues(sudoku) -> List[int]:
+    return [int(clue) for clue in __parse(sudoku)[0]]
+
+
+# given a sudoku string, returns a list of the 81 cell values in
+# row-major order, with 0 for empty cells. Raises ValueError if it doesn't
+# have exactly 81 cells.
+def cells(sudoku: str) -> List[int]:
     # strip all whitespace, newlines, tabs, etc
     sudoku = re.sub(r"\s+", "", sudoku)
+    __check_cells(len(sudoku))
     separator = __getSeparator(sudoku)
-    # split sudoku into chunks of 9
-    for row, column in itertools.product(range(9), range(9)):
-        cell = sudoku[(9 * row) + column]
-        if cell != separator:
-            sudoku_list.append(__enc(row + 1, column + 1, int(cell)))
-            count += 1
+    return [0 if cell == separator else int(cell) for cell in sudoku]
 
-    return (sudoku_list, count)
+
+def __check_cells(count: int) -> None:
+    if count != 81:
+        raise ValueError(f"puzzle has {count} cells, not 81")
 
 
 def __enc(row: int, column: int, value: int) -> str:
@@ -65,68 +209,82 @@ def __enc(row: int, column: int, value: int) -> str:
     return str(cell)
 
 
-def __create_cnf(
-    sudoku_list: list, count: int, encoding=Encoding.MINIMAL, cache_in=None
-) -> str:
+# returns the path of the cached fixed CNF for encoding in cache_in,
+# writing it first if it doesn't exist yet.
+def __cache_file(encoding: Encoding, cache_in: str) -> str:
     filename = f"{cache_in}sudoku_rules_{encoding.name.lower()}.cnf"
+    if not os.path.exists(filename):
+        mkdir = f"mkdir -p {cache_in}"
+        os.system(mkdir)
+        # written to a temporary file and renamed into place, so a run that
+        # is killed part way through never leaves a truncated file that a
+        # resumed run would reuse
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as file:
+            file.write(__header(encoding) + __fixed_cnf(encoding))
+        os.replace(tmp, filename)
+    return filename
+
 
-    # if cache is true, cache fixed cnf in a file in the cwd so it can be reused
-    if cache_in:
-        if not os.path.exists(filename):
-            mkdir = f"mkdir -p {cache_in}"
-            os.system(mkdir)
-            with open(filename, "w") as file:
-                header, cnf = __fixed_cnf(encoding)
-                file.write(header + cnf)
-
-        sudoku_rules = open(filename, "r")
-        header = sudoku_rules.readline()
-
-        cnf = sudoku_rules.read()
-    else:
-        header, cnf = __fixed_cnf(encoding)
-        # split on newlines
-
-    # header format is p cnf <number of variables> <number of clauses>
-    # split the header into a list
-    header = header.split()
-    # get the number of variables and clauses
-    num_variables = int(header[2])
-    num_clauses = int(header[3]) + count
-    # create clauses for each cell
-    for sudoku in sudoku_list:
-        cnf = cnf + sudoku + " 0\n"
-    # add the header
-    header = f"p cnf {num_variables} {str(num_clauses)}" + "\n"
-    cnf = header + cnf
-    return cnf
-
-
-def __fixed_cnf(encoding=Encoding.MINIMAL) -> tuple:
-    header = ""
-    if encoding == Encoding.MINIMAL:
-        header = "p cnf 729 8829\n"
-    elif encoding == Encoding.EFFICIENT:
-        header = "p cnf 729 11745\n"
-    elif encoding == Encoding.EXTENDED:
-        header = "p cnf 729 11988\n"
-
-    cnf = __cell_one_number()
-
-    cnf += __num_once_in_row()
-
-    cnf += __num_once_in_column()
-
-    cnf += __num_once_in_box()
+# returns the fixed CNF of encoding, without a header, from the copy in
+# satcoder/data, or built from scratch if that is missing or out of date.
+def __fixed_cnf(encoding=Encoding.MINIMAL) -> bytes:
+    try:
+        header, cnf = __read_data(__data_file(encoding)).split(b"\n", 1)
+        if header + b"\n" == __header(encoding):
+            return cnf
+    except (FileNotFoundError, ValueError):
+        pass
+    return "".join(__fixed_clauses(encoding)).encode()
+
+
+def __read_data(name: str) -> bytes:
+    path = os.path.join(os.path.dirname(__file__), DATA_DIR, name)
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            return f.read()
+    # not installed as plain files (e.g. from a zip). importlib.resources is
+    # only imported here because importing it takes longer than building
+    # the rules does.
+    from importlib import resources
+
+    return (resources.files(__package__) / DATA_DIR / name).read_bytes()
+
+
+def __header(encoding: Encoding) -> bytes:
+    return f"p cnf {VARIABLES} {CLAUSES[encoding]}\n".encode()
+
+
+def __data_file(encoding: Encoding) -> str:
+    return f"rules_{encoding.name.lower()}.cnf"
+
+
+# writes the fixed CNF of every encoding to directory, in the format
+# __fixed_cnf expects, to rebuild the prebuilt copies in satcoder/data.
+def write_rule_data(directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for encoding in Encoding:
+        with open(os.path.join(directory, __data_file(encoding)), "wb") as f:
+            f.write(__header(encoding))
+            __write_lines(f.write, __fixed_clauses(encoding))
+
+
+# yields the clauses of the fixed CNF one line at a time
+def __fixed_clauses(encoding=Encoding.MINIMAL) -> Iterator[str]:
+    yield from __cell_one_number()
+
+    yield from __num_once_in_row()
+
+    yield from __num_once_in_column()
+
+    yield from __num_once_in_box()
 
     if encoding in [Encoding.EFFICIENT, Encoding.EXTENDED]:
-        cnf += __at_most_one_number()
+        yield from __at_most_one_number()
     if encoding == Encoding.EXTENDED:
-        cnf += __each_number_at_least_once_row()
-        cnf += __each_number_at_least_once_col()
-        cnf += __each_number_at_least_once_box()
-
-    return header, cnf
+        yield from __each_number_at_least_once_row()
+        yield from __each_number_at_least_once_col()
+        yield from __each_number_at_least_once_box()
 
 
 # Below Lies The Land Of Nested For Loops
@@ -134,82 +292,59 @@ def __fixed_cnf(encoding=Encoding.MINIMAL) -> tuple:
 # spaghetti monster for itertools.product)
 
 
-def __cell_one_number() -> str:
-    cnf = ""
+def __cell_one_number() -> Iterator[str]:
     for i, j in itertools.product(range(1, 10), range(1, 10)):
-        for k in range(1, 10):
-            cnf += f"{str(__enc(i, j, k))} "
-        cnf += "0\n"
-    return cnf
+        yield " ".join(__enc(i, j, k) for k in range(1, 10)) + " 0\n"
 
 
-def __num_once_in_row() -> str:
-    cnf = ""
+def __num_once_in_row() -> Iterator[str]:
     for i, k, j in itertools.product(range(1, 10), range(1, 10), range(1, 9)):
         for l in range((j + 1), 10):
-            cnf += f"-{str(__enc(i, j, k))} -{str(__enc(i, l, k))}" + " 0\n"
-    return cnf
+            yield f"-{__enc(i, j, k)} -{__enc(i, l, k)} 0\n"
 
 
-def __num_once_in_column() -> str:
-    cnf = ""
+def __num_once_in_column() -> Iterator[str]:
     for j, k, i in itertools.product(range(1, 10), range(1, 10), range(1, 9)):
         for l in range((i + 1), 10):
-            cnf += f"-{str(__enc(i, j, k))} -{str(__enc(l, j, k))}" + " 0\n"
-    return cnf
+            yield f"-{__enc(i, j, k)} -{__enc(l, j, k)} 0\n"
 
 
-def __num_once_in_box() -> str:
-    cnf = ""
+def __num_once_in_box() -> Iterator[str]:
     for k, a, b, u, v in itertools.product(
         range(1, 10), range(3), range(3), range(1, 4), range(1, 3)
     ):
         for w in range((v + 1), 4):
-            cnf += (
-                f"-{str(__enc(3 * a + u, 3 * b + v, k))} -{str(__enc(3 * a + u, 3 * b + w, k))}"
-                + " 0\n"
-            )
+            yield f"-{__enc(3 * a + u, 3 * b + v, k)} -{__enc(3 * a + u, 3 * b + w, k)} 0\n"
     for k, a, b, u, v in itertools.product(
         range(1, 10), range(3), range(3), range(1, 3), range(1, 4)
     ):
         for w, t in itertools.product(range((u + 1), 4), range(1, 4)):
-            cnf += (
-                f"-{str(__enc(3 * a + u, 3 * b + v, k))} -{str(__enc(3 * a + w, 3 * b + t, k))}"
-                + " 0\n"
-            )
-    return cnf
+            yield f"-{__enc(3 * a + u, 3 * b + v, k)} -{__enc(3 * a + w, 3 * b + t, k)} 0\n"
 
 
-def __at_most_one_number() -> str:
-    cnf = ""
+def __at_most_one_number() -> Iterator[str]:
     for i, j, k in itertools.product(range(1, 10), range(1, 10), range(1, 9)):
         for l in range((k + 1), 10):
-            cnf += f"-{str(__enc(i, j, k))} -{str(__enc(i, j, l))}" + " 0\n"
-    return cnf
+            yield f"-{__enc(i, j, k)} -{__enc(i, j, l)} 0\n"
 
 
-def __each_number_at_least_once_row() -> str:
-    cnf = ""
+def __each_number_at_least_once_row() -> Iterator[str]:
     for i, k in itertools.product(range(1, 10), range(1, 10)):
-        for j in range(1, 10):
-            cnf += f"{str(__enc(i, j, k))} "
-        cnf += "0\n"
-    return cnf
+        yield " ".join(__enc(i, j, k) for j in range(1, 10)) + " 0\n"
 
 
-def __each_number_at_least_once_col() -> str:
-    cnf = ""
+def __each_number_at_least_once_col() -> Iterator[str]:
     for j, k in itertools.product(range(1, 10), range(1, 10)):
-        for i in range(1, 10):
-            cnf += f"{str(__enc(i, j, k))} "
-        cnf += "0\n"
-    return cnf
+        yield " ".join(__enc(i, j, k) for i in range(1, 10)) + " 0\n"
 
 
-def __each_number_at_least_once_box() -> str:
-    cnf = ""
+def __each_number_at_least_once_box() -> Iterator[str]:
     for k, a, b in itertools.product(range(1, 10), range(3), range(3)):
-        for u, v in itertools.product(range(1, 4), range(1, 4)):
-            cnf += f"{str(__enc(3 * a + u, 3 * b + v, k))} "
-        cnf += "0\n"
-    return cnf
+        yield " ".join(
+            __enc(3 * a + u, 3 * b + v, k)
+            for u, v in itertools.product(range(1, 4), range(1, 4))
+        ) + " 0\n"
+
+
+if __name__ == "__main__":
+    write_rule_data(os.path.join(os.path.dirname(os.path.abspath(__file__)), DATA_DIR))
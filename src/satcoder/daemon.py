@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Set
+
+from .cnf import VARIABLES, Encoding, cells, encode, rules
+from .solver import Solver
+from .sudoku import decode
+
+# Long lived solving service, so callers don't pay for starting Python,
+# importing satcoder and building the rule bases on every puzzle. Listens
+# on a Unix socket or localhost TCP for requests as line-delimited JSON:
+#
+#   {"id": 1, "op": "solve", "puzzle": "4.....8.5.3..."}
+#   {"id": 2, "op": "encode", "puzzle": "4.....8.5.3...", "encoding": "extended"}
+#   {"id": 3, "op": "decode", "assignment": "SAT\n1 -2 -3 ... 0"}
+#
+# and answers each with a line like
+#
+#   {"id": 1, "result": "417369825...", "timing": {"batch": 12, ...}}
+#
+# or {"id": 1, "error": "..."}. "solve" uses the native solver and returns
+# the solution in the one-line format ("" if there is none) along with its
+# decisions and propagations, "encode" returns the CNF sud2sat would print,
+# and "decode" what sat2sud would print. "encode" and "decode" take an
+# optional "seed", as with sud2sat --seed. Responses on a connection can come
+# back out of order, the id (any JSON value) is echoed to match them up.
+#
+# Requests are collected into batches of up to --batch, waiting at most
+# --wait milliseconds for a batch to fill, and each batch is run by one of
+# a pool of worker processes, which build every rule base once at startup.
+# The timing of a response is in milliseconds: "run" is the time spent on
+# the request in the worker, and "total" the time from it being received
+# to the result being ready, so "total" - "run" is the batching and
+# queueing overhead.
+
+DEFAULT_PORT = 7878
+BATCH_SIZE = 64
+BATCH_WAIT = 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve sudoku solving and encoding requests over a socket"
+    )
+    args = setup_args(parser)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+def setup_args(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    parser.add_argument(
+        "-u", "--socket", default="", help="listen on this Unix socket instead of TCP"
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="TCP address to listen on (default 127.0.0.1)"
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"TCP port to listen on (default {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"most requests to send a worker at once (default {BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "-w",
+        "--wait",
+        type=float,
+        default=BATCH_WAIT,
+        help=f"milliseconds to wait for a batch to fill (default {BATCH_WAIT})",
+    )
+    return parser.parse_args()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    with ProcessPoolExecutor(args.jobs, initializer=warm) as executor:
+        batcher = Batcher(executor, args.batch, args.wait / 1000)
+        handler = Handler(batcher)
+        if args.socket:
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+            server = await asyncio.start_unix_server(handler.handle, path=args.socket)
+            address = args.socket
+        else:
+            server = await asyncio.start_server(handler.handle, args.host, args.port)
+            address = f"{args.host}:{args.port}"
+        print(f"Listening on {address}", flush=True)
+        async with server:
+            await asyncio.gather(server.serve_forever(), batcher.run())
+
+
+# builds every rule base, so the first requests a worker gets aren't slowed
+# down by it. Runs once in each worker process.
+def warm() -> None:
+    for enc in Encoding:
+        rules(enc)
+
+
+# runs a batch of requests in a worker, returns the response and the
+# seconds spent on each.
+def run_batch(requests: List[dict]) -> List[tuple]:
+    results = []
+    for request in requests:
+        start = time.perf_counter()
+        # one bad request only fails itself, not the rest of its batch
+        try:
+            response = run_request(request)
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        results.append((response, time.perf_counter() - start))
+    return results
+
+
+def run_request(request: dict) -> dict:
+    op = request.get("op", "solve")
+    if op == "decode":
+        assignment = request["assignment"].split("\n", 1)[-1]
+        for literal in assignment.split():
+            if not -VARIABLES <= int(literal) <= VARIABLES:
+                raise ValueError(f"literal {literal} is not a sudoku variable")
+        return {"result": decode(assignment, request.get("seed"))}
+
+    puzzle = request["puzzle"]
+    grid = cells(puzzle) if isinstance(puzzle, str) else list(puzzle)
+    if len(grid) != 81:
+        raise ValueError("puzzle must have 81 cells")
+    if op == "encode":
+        enc = Encoding[request.get("encoding", "minimal").upper()]
+        return {"result": encode(grid, enc, seed=request.get("seed"))}
+    if op == "solve":
+        solver = Solver()
+        solution = solver.solve(grid)
+        return {
+            "result": "".join(map(str, solution)) if solution else "",
+            "decisions": solver.decisions,
+            "propagations": solver.propagations,
+        }
+    raise ValueError(f"unknown op {op}")
+
+
+# collects requests into batches and hands them to the workers
+class Batcher:
+    def __init__(self, executor, size: int, wait: float) -> None:
+        self.executor = executor
+        self.size = size
+        self.wait = wait
+        self.queue: Optional[asyncio.Queue] = None
+        # batches being run, kept so they aren't garbage collected
+        self.__running: Set[asyncio.Task] = set()
+
+    # returns the response to a request, once its batch has been run
+    async def submit(self, request: dict) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        await self.__queue().put((request, time.perf_counter(), future))
+        return await future
+
+    async def run(self) -> None:
+        queue = self.__queue()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.wait
+            while len(batch) < self.size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # don't wait for the batch to finish, the next one can go to
+            # another worker in the meantime
+            task = asyncio.create_task(self.__dispatch(batch))
+            self.__running.add(task)
+            task.add_done_callback(self.__running.discard)
+
+    async def __dispatch(self, batch: list) -> None:
+        loop = asyncio.get_running_loop()
+        requests = [request for request, _, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, run_batch, requests)
+        except Exception as e:
+            # a dict each, since timing is added to every response
+            results = [({"error": f"worker failed: {e}"}, 0.0) for _ in batch]
+        done = time.perf_counter()
+        for (request, received, future), (response, run) in zip(batch, results):
+            response["timing"] = {
+                "batch": len(batch),
+                "run": round(run * 1000, 3),
+                "total": round((done - received) * 1000, 3),
+            }
+            if not future.done():
+                future.set_result(response)
+
+    # the queue has to be made inside the running event loop
+    def __queue(self) -> asyncio.Queue:
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+
+class Handler:
+    def __init__(self, batcher: Batcher) -> None:
+        self.batcher = batcher
+
+    async def handle(self, reader, writer) -> None:
+        pending: Set[asyncio.Task] = set()
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.__respond(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            # client went away, or sent a line longer than the stream limit
+            pass
+        finally:
+            writer.close()
+
+    async def __respond(self, line: bytes, writer) -> None:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            response = {"id": None, "error": f"invalid request: {e}"}
+        else:
+            response = {"id": request.get("id")}
+            response.update(await self.batcher.submit(request))
+        if writer.is_closing():
+            return
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    main()
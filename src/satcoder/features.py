@@ -0,0 +1,110 @@
+import json
+import math
+from typing import Dict, List
+
+from .cnf import Encoding
+from .solver import BITS, BOXES, COLS, ROWS, Solver
+
+# Puzzle features, and a predictor trained on them that chooses the
+# encoding (and solver) to use for a puzzle. Features are cheap to compute:
+# they only need the clues and one round of propagation by the native solver.
+#
+# The predictor is a nearest-centroid classifier. Training takes the
+# features of every puzzle from past satmark runs, labelled with the member
+# (e.g. "minimal", or "extended-cadical") that solved it fastest, and stores
+# the mean feature vector of each label. A new puzzle gets the label of the
+# closest mean, after scaling every feature to unit variance.
+
+FEATURES = (
+    "clues",
+    "forced",
+    "candidates",
+    "rowSpread",
+    "colSpread",
+    "boxSpread",
+    "minBoxClues",
+    "maxBoxClues",
+)
+
+
+# returns the features of a puzzle (a list of 81 cell values), in the
+# order of FEATURES.
+def features(grid: List[int]) -> Dict[str, float]:
+    clues = sum(1 for cell in grid if cell)
+    cand = Solver().candidates(grid)
+    if cand is None:
+        # contradicting clues, nothing is left to search
+        forced, candidates = 81 - clues, 0
+    else:
+        solved = sum(1 for m in cand if BITS[m] == 1)
+        forced = solved - clues
+        candidates = sum(BITS[m] for m in cand if BITS[m] > 1)
+
+    def spread(units) -> float:
+        counts = [sum(1 for i in unit if grid[i]) for unit in units]
+        mean = sum(counts) / len(counts)
+        return math.sqrt(sum((c - mean) ** 2 for c in counts) / len(counts))
+
+    box_clues = [sum(1 for i in box if grid[i]) for box in BOXES]
+    return {
+        "clues": clues,
+        "forced": forced,
+        "candidates": candidates,
+        "rowSpread": round(spread(ROWS), 4),
+        "colSpread": round(spread(COLS), 4),
+        "boxSpread": round(spread(BOXES), 4),
+        "minBoxClues": min(box_clues),
+        "maxBoxClues": max(box_clues),
+    }
+
+
+def vector(feats: Dict[str, float]) -> List[float]:
+    return [float(feats[name]) for name in FEATURES]
+
+
+# train a model from feature vectors and the label of the fastest member
+# for each. returns the model as a dict that can be saved as JSON.
+def fit(vectors: List[List[float]], labels: List[str]) -> dict:
+    n = len(vectors)
+    mean = [sum(col) / n for col in zip(*vectors)]
+    std = [
+        math.sqrt(sum((x - m) ** 2 for x in col) / n) or 1.0
+        for col, m in zip(zip(*vectors), mean)
+    ]
+    groups: Dict[str, List[List[float]]] = {}
+    for v, label in zip(vectors, labels):
+        groups.setdefault(label, []).append(scale(v, mean, std))
+    centroids = {
+        label: [sum(col) / len(vs) for col in zip(*vs)] for label, vs in groups.items()
+    }
+    return {"features": list(FEATURES), "mean": mean, "std": std, "centroids": centroids}
+
+
+class Selector:
+    def __init__(self, model: dict) -> None:
+        if model.get("features") != list(FEATURES):
+            raise ValueError("model was trained on different features")
+        self.mean = model["mean"]
+        self.std = model["std"]
+        self.centroids: Dict[str, List[float]] = model["centroids"]
+
+    @classmethod
+    def load(cls, path: str) -> "Selector":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    # returns the name of the member predicted to be fastest for grid
+    def choose(self, grid: List[int]) -> str:
+        v = scale(vector(features(grid)), self.mean, self.std)
+        return min(
+            self.centroids,
+            key=lambda label: sum((a - b) ** 2 for a, b in zip(v, self.centroids[label])),
+        )
+
+    # the encoding part of the chosen member, e.g. EXTENDED for extended-cadical
+    def choose_encoding(self, grid: List[int]) -> Encoding:
+        return Encoding[self.choose(grid).split("-")[0].upper()]
+
+
+def scale(v: List[float], mean: List[float], std: List[float]) -> List[float]:
+    return [(x - m) / s for x, m, s in zip(v, mean, std)]
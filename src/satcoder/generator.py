@@ -0,0 +1,71 @@
+import random
+from functools import partial
+from multiprocessing import Pool
+from typing import Iterator, List
+
+from .solver import Solver
+
+# Puzzle generator. Each puzzle is built by filling an empty grid with the
+# native solver (trying candidates in a random order), then removing clues
+# in a random order, putting back any clue whose removal would give the
+# puzzle more than one solution, until the target number of clues is left.
+# Every puzzle gets its own random generator seeded from (seed, index), so
+# the output only depends on the seed, not on how many processes are used.
+
+# greedy clue removal rarely gets below ~20 clues, so give up on a target
+# after this many fresh grids instead of looping forever.
+ATTEMPTS = 100
+
+
+# generate the puzzle at position index of the sequence for seed.
+# clues is the exact number of clues the puzzle will have, and difficulty
+# is the minimum number of decisions the native solver needs to solve it.
+# returns the puzzle in the one-line format, with "." for empty cells.
+def generate(seed: int, index: int = 0, clues: int = 25, difficulty: int = 0) -> str:
+    rng = random.Random(f"{seed}:{index}")
+    for _ in range(ATTEMPTS):
+        grid = Solver(rng).solve([0] * 81)
+        puzzle = __dig(grid, clues, rng)
+        if puzzle is None:
+            continue
+        solver = Solver()
+        solver.solve(puzzle)
+        if solver.decisions >= difficulty:
+            return "".join(str(cell) if cell else "." for cell in puzzle)
+    raise ValueError(
+        f"could not generate a puzzle with {clues} clues and difficulty {difficulty}"
+    )
+
+
+# generate count puzzles for seed, spread across a pool of processes.
+# puzzles are yielded in order as they are finished, so they can be written
+# out without holding the whole set in memory.
+def generate_many(
+    count: int, seed: int, clues: int = 25, difficulty: int = 0, processes=None
+) -> Iterator[str]:
+    make = partial(__generate_index, seed=seed, clues=clues, difficulty=difficulty)
+    with Pool(processes) as p:
+        yield from p.imap(make, range(count), chunksize=64)
+
+
+# Pool.imap passes the index positionally, so it needs to come first
+def __generate_index(index: int, seed: int, clues: int, difficulty: int) -> str:
+    return generate(seed, index, clues, difficulty)
+
+
+# remove clues from a solved grid until only clues are left,
+# returns None if that can't be done while keeping the solution unique
+def __dig(grid: List[int], clues: int, rng: random.Random):
+    puzzle = grid.copy()
+    filled = 81
+    order = list(range(81))
+    rng.shuffle(order)
+    for i in order:
+        if filled == clues:
+            break
+        puzzle[i] = 0
+        if Solver().count(puzzle, 2) == 1:
+            filled -= 1
+        else:
+            puzzle[i] = grid[i]
+    return puzzle if filled == clues else None
@@ -0,0 +1,61 @@
+from typing import Dict, List, Optional, Tuple
+
+from .cnf import Encoding, clues, rules
+
+# Incremental solving over a persistent rule base. Instead of giving a fresh
+# solver the whole CNF of every puzzle, the rules of an encoding are loaded
+# into one long lived solver, and each puzzle's clues are passed to it as
+# assumptions. Assumptions are only decisions, not clauses, so everything
+# the solver learns while solving one puzzle follows from the rules alone,
+# and is kept for the next puzzle. Needs python-sat, which is an optional
+# dependency (pip install satsudoku[incremental]).
+
+# the python-sat solver used if none is given, any of pysat's solver names
+# works (e.g. "glucose4", "cadical153")
+DEFAULT_BACKEND = "minisat22"
+
+
+class IncrementalSolver:
+    def __init__(self, encoding=Encoding.MINIMAL, backend=DEFAULT_BACKEND) -> None:
+        try:
+            from pysat.solvers import Solver as Backend
+        except ImportError:
+            raise ImportError(
+                "incremental solving needs python-sat, install it with "
+                "pip install satsudoku[incremental]"
+            ) from None
+        self.encoding = encoding
+        self.backend = backend
+        self.__solver = Backend(name=backend, use_timer=True)
+        for line in rules(encoding).cnf.decode().splitlines():
+            self.__solver.add_clause([int(x) for x in line.split()[:-1]])
+        self.__totals = self.__stats()
+
+    # solves a sudoku (a string, or 81 cell values), returns the model (a
+    # literal for every variable, as a SAT solver would print it), or None
+    # if there is no solution, and the solver's stats for this puzzle alone:
+    # decisions, propagations, conflicts, restarts, and time in seconds.
+    def solve(self, sudoku) -> Tuple[Optional[List[int]], Dict[str, float]]:
+        sat = self.__solver.solve(assumptions=clues(sudoku))
+        model = self.__solver.get_model() if sat else None
+        # the solver's stats are totals since it was created
+        totals = self.__stats()
+        stats: Dict[str, float] = {
+            key: value - self.__totals.get(key, 0) for key, value in totals.items()
+        }
+        stats["time"] = self.__solver.time()
+        self.__totals = totals
+        return model, stats
+
+    def close(self) -> None:
+        self.__solver.delete()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # not every backend keeps stats
+    def __stats(self) -> Dict[str, int]:
+        return dict(self.__solver.accum_stats() or {})
@@ -0,0 +1,68 @@
+import random
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+from .cnf import VARIABLES, Encoding, RuleBase
+
+# Seeded layouts of the CNF. A solver's running time depends on more than
+# the encoding: the order of the clauses, the order of the literals in each
+# clause, and how the variables are numbered all change the choices it
+# makes, so two encodings can differ by luck of the layout alone. A Layout
+# shuffles all three, and the same seed always gives the same layout:
+#
+# - variables are renumbered by a random permutation of 1..VARIABLES, and
+#   decode maps them back with its inverse.
+# - the literals of every clause are shuffled.
+# - the clauses, including the puzzle's clues, are shuffled.
+#
+# The layout of a puzzle only depends on the seed and the puzzle, so a
+# benchmark can be repeated under the same layouts. encode writes the seed
+# in a "c seed" comment at the top of the CNF.
+
+
+class Layout:
+    def __init__(self, seed: int) -> None:
+        self.seed = seed
+        numbers = list(range(1, VARIABLES + 1))
+        random.Random(f"{seed}:variables").shuffle(numbers)
+        # variables[v] is the number of variable v in this layout, and
+        # inverse[variables[v]] == v. Index 0 is unused.
+        self.variables = [0] + numbers
+        self.inverse = [0] * (VARIABLES + 1)
+        for v, n in enumerate(self.variables):
+            self.inverse[n] = v
+        self.__rules: Dict[Encoding, List[str]] = {}
+
+    # the clauses of the rules and the clues (variables of the canonical
+    # numbering, as cnf.encode gives them), as CNF lines in this layout
+    def clauses(self, rule_base: RuleBase, clues: Iterable[str]) -> List[str]:
+        lines = self.__rule_lines(rule_base) + [
+            f"{self.variables[int(clue)]} 0\n" for clue in clues
+        ]
+        random.Random(f"{self.seed}:clauses").shuffle(lines)
+        return lines
+
+    # maps a literal of this layout back to the canonical numbering
+    def original(self, literal: int) -> int:
+        return self.inverse[literal] if literal > 0 else -self.inverse[-literal]
+
+    # the rules are renumbered and their literals shuffled once per encoding
+    def __rule_lines(self, rule_base: RuleBase) -> List[str]:
+        if rule_base.encoding not in self.__rules:
+            rng = random.Random(f"{self.seed}:literals")
+            lines = []
+            for line in rule_base.cnf.decode().splitlines():
+                literals = [self.__map(int(x)) for x in line.split()[:-1]]
+                rng.shuffle(literals)
+                lines.append(" ".join(map(str, literals)) + " 0\n")
+            self.__rules[rule_base.encoding] = lines
+        return self.__rules[rule_base.encoding]
+
+    def __map(self, literal: int) -> int:
+        return self.variables[literal] if literal > 0 else -self.variables[-literal]
+
+
+# the Layout for seed, built once per process
+@lru_cache(maxsize=16)
+def layout(seed: int) -> Layout:
+    return Layout(seed)
@@ -0,0 +1,116 @@
+import mmap
+import re
+import string
+from typing import List, Optional
+
+# Bulk loader for puzzle files. Instead of parsing one puzzle at a time,
+# the whole file is read as bytes, the lines that aren't part of a puzzle
+# are skipped, all other whitespace is deleted, and every cell is converted
+# to its value with a single bytes.translate. The empty cell character is
+# detected once per file, the same way encode detects it for one puzzle.
+# Every puzzle must have exactly 81 cells, so one that is too short or too
+# long is an error rather than shifting the puzzles after it.
+
+DIGITS = b"123456789"
+LINE_WHITESPACE = string.whitespace.replace("\n", "").encode()
+INVALID = 0xFF
+NEWLINE = ord("\n")
+EMPTY_CELL = re.compile(rb"[^1-9\n]")
+
+
+# load the puzzles in the file at path, where each puzzle takes up size lines
+# and is preceded by offset lines that aren't part of it (the same layout
+# as a puzzle set in sat_config.json). Only the first count puzzles are
+# loaded if count is given.
+# returns a memoryview of shape (N, 81) of cell values (0 for empty),
+# row-major. It can be wrapped without copying, e.g. numpy.asarray(view),
+# or turned into lists with view.tolist().
+def load(path: str, size: int = 1, offset: int = 0, count=None) -> memoryview:
+    with open(path, "rb") as f:
+        # mmap can't map empty files
+        if f.seek(0, 2) == 0:
+            return __view(b"")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse(data, size, offset, count)
+
+
+# same as load, but on the contents of a puzzle file. Raises ValueError if
+# any puzzle doesn't have exactly 81 cells.
+def parse(data, size: int = 1, offset: int = 0, count=None) -> memoryview:
+    # whitespace within a line is deleted with one translate, the newlines
+    # are kept to tell the puzzles apart
+    data = bytes(data).translate(None, LINE_WHITESPACE)
+    start = __one_per_line(data) if size == 1 and not offset else None
+    if start is None:
+        cells = b"".join(__puzzles(data, size, offset, count))
+    else:
+        # the newlines are deleted by the same translate as the cells
+        cells = data if count is None else data[: start + 82 * count]
+
+    cells = cells.translate(__table(__empty_cell(cells)), b"\n")
+    if INVALID in cells:
+        raise ValueError("puzzle data contains more than one empty cell character")
+    return __view(cells)
+
+
+# if data has one puzzle of 81 cells on every line, with blank lines only at
+# either end, returns where the first puzzle starts, otherwise None. This is
+# checked without splitting data into lines, which takes longer than the
+# rest of parse.
+def __one_per_line(data: bytes) -> Optional[int]:
+    start, end = 0, len(data)
+    while start < end and data[start] == NEWLINE:
+        start += 1
+    while end > start and data[end - 1] == NEWLINE:
+        end -= 1
+    n, rest = divmod(end - start + 1, 82)
+    if not n or rest or data.count(b"\n", start, end) != n - 1:
+        return None
+    return start if data[start + 81 : end : 82] == b"\n" * (n - 1) else None
+
+
+# the cells of each puzzle in data, the first count of them if count is
+# given. Raises ValueError if any of them doesn't have 81 cells.
+def __puzzles(data: bytes, size: int, offset: int, count) -> List[bytes]:
+    lines = data.split(b"\n")
+    if offset:
+        # the lines between puzzles are skipped by position, so blank lines
+        # count, except at the end of the file
+        while lines and not lines[-1]:
+            lines.pop()
+        stride = size + offset
+        puzzles = [
+            b"".join(lines[i + offset : i + stride])
+            for i in range(0, len(lines), stride)
+        ]
+    else:
+        lines = [line for line in lines if line]
+        puzzles = [b"".join(lines[i : i + size]) for i in range(0, len(lines), size)]
+    if count is not None:
+        puzzles = puzzles[:count]
+    if set(map(len, puzzles)) - {81}:
+        i, n = next((i, len(p)) for i, p in enumerate(puzzles) if len(p) != 81)
+        raise ValueError(f"puzzle {i + 1} has {n} cells, not 81")
+    return puzzles
+
+
+# a view can't have a 0 in its shape, so with no puzzles it is flat instead
+# of (0, 81). It is still empty, and tolist() still gives [].
+def __view(cells: bytes) -> memoryview:
+    if not cells:
+        return memoryview(cells)
+    return memoryview(cells).cast("B", (len(cells) // 81, 81))
+
+
+# the first character that isn't 1-9 is the empty cell character
+def __empty_cell(cells: bytes) -> int:
+    match = EMPTY_CELL.search(cells)
+    return match[0][0] if match else ord("0")
+
+
+def __table(empty: int) -> bytes:
+    table = bytearray([INVALID] * 256)
+    for value, digit in enumerate(DIGITS, 1):
+        table[digit] = value
+    table[empty] = 0
+    return bytes(table)
@@ -1,20 +1,29 @@
+import argparse
 import fileinput
-import sys
 
 from . import decode
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert a SAT assignment to a sudoku")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="seed the CNF was encoded with by sud2sat --seed",
+    )
+    args, rest = parser.parse_known_args()
+
     try:
         fileinput.filename()
         # get the sudoku from stdin
-        sudoku = "".join(list(fileinput.input())[1:])
+        sudoku = "".join(list(fileinput.input(files=rest))[1:])
     except (FileNotFoundError, RuntimeError):
         # get from arguments if no input is given
-        sudoku = " ".join(sys.argv[1:])
+        sudoku = " ".join(rest)
 
     # print the solved sudoku to stdout
-    print(decode(sudoku))
+    print(decode(sudoku, args.seed))
 
 
 if __name__ == "__main__":
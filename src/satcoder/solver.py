@@ -0,0 +1,152 @@
+import itertools
+import random
+from typing import Iterator, List, Optional, Tuple
+
+from .cnf import cells
+from .sudoku import to_string
+
+# Native sudoku solver. Instead of going through a CNF encoding and an
+# external SAT solver, this works on the puzzle directly. Every cell holds
+# a 9 bit mask of the values it can still take (bit 0 is 1, bit 8 is 9),
+# and the solver alternates between propagation (naked and hidden singles)
+# and backtracking on the cell with the fewest candidates left (MRV).
+
+ALL = 0x1FF
+
+ROWS = [[9 * r + c for c in range(9)] for r in range(9)]
+COLS = [[9 * r + c for r in range(9)] for c in range(9)]
+BOXES = [
+    [9 * (3 * a + u) + 3 * b + v for u, v in itertools.product(range(3), range(3))]
+    for a, b in itertools.product(range(3), range(3))
+]
+UNITS = ROWS + COLS + BOXES
+# every cell shares a unit with 20 other cells, its peers
+PEERS = [
+    tuple(sorted({p for unit in UNITS if i in unit for p in unit} - {i}))
+    for i in range(81)
+]
+# lookup tables, so the inner loops don't have to count bits
+BITS = [bin(m).count("1") for m in range(ALL + 1)]
+VALUE = {1 << (v - 1): v for v in range(1, 10)}
+
+
+class Solver:
+    # if rng is given, candidates are tried in a random order when
+    # backtracking, instead of smallest first. This is used to fill
+    # grids when generating puzzles.
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        self.rng = rng
+        # decisions are branches taken while backtracking, propagations
+        # are cells assigned a value, either from a decision or forced.
+        # These mirror the stats minisat reports, so the two can be compared.
+        self.decisions = 0
+        self.propagations = 0
+
+    # given a list of 81 cell values (0 for empty), returns the solved
+    # list of cell values, or None if the puzzle has no solution.
+    def solve(self, grid: List[int]) -> Optional[List[int]]:
+        return next(self.solutions(grid), None)
+
+    # counts the solutions of the puzzle, stopping once limit is reached
+    def count(self, grid: List[int], limit: int = 2) -> int:
+        return len(self.first(grid, limit))
+
+    # the first limit solutions of the puzzle, from one search
+    def first(self, grid: List[int], limit: int = 2) -> List[List[int]]:
+        return list(itertools.islice(self.solutions(grid), limit))
+
+    # yields every solution of the puzzle, in search order
+    def solutions(self, grid: List[int]) -> Iterator[List[int]]:
+        cand = self.candidates(grid)
+        if cand is not None:
+            yield from self.__search(cand)
+
+    # the candidate masks of every cell once the clues have been propagated,
+    # before any decisions are made, or None if the clues contradict.
+    def candidates(self, grid: List[int]) -> Optional[List[int]]:
+        cand = [ALL] * 81
+        queue = [(i, 1 << (v - 1)) for i, v in enumerate(grid) if v]
+        return cand if self.__propagate(cand, queue) else None
+
+    def __search(self, cand: List[int]) -> Iterator[List[int]]:
+        # pick the unsolved cell with the fewest candidates
+        best, fewest = -1, 10
+        for i, m in enumerate(cand):
+            n = BITS[m]
+            if 1 < n < fewest:
+                best, fewest = i, n
+                if n == 2:
+                    break
+        if best < 0:
+            yield [VALUE[m] for m in cand]
+            return
+
+        bits = [1 << k for k in range(9) if cand[best] & (1 << k)]
+        if self.rng:
+            self.rng.shuffle(bits)
+        for bit in bits:
+            self.decisions += 1
+            branch = cand.copy()
+            if self.__propagate(branch, [(best, bit)]):
+                yield from self.__search(branch)
+
+    # assign every (cell, bit) pair in queue, and keep assigning cells
+    # that are forced by those assignments until nothing changes.
+    # returns False if a contradiction is found.
+    def __propagate(self, cand: List[int], queue: list) -> bool:
+        while queue:
+            # naked singles, a cell with one candidate left
+            while queue:
+                i, bit = queue.pop()
+                if not cand[i] & bit:
+                    return False
+                cand[i] = bit
+                self.propagations += 1
+                for p in PEERS[i]:
+                    m = cand[p]
+                    if m & bit:
+                        m ^= bit
+                        if not m:
+                            return False
+                        cand[p] = m
+                        if BITS[m] == 1:
+                            queue.append((p, m))
+
+            # hidden singles, a value that only fits one cell in a unit
+            for unit in UNITS:
+                once = more = 0
+                for i in unit:
+                    more |= once & cand[i]
+                    once |= cand[i]
+                if once != ALL:
+                    return False
+                hidden = once & ~more
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for i in unit:
+                        if cand[i] & bit:
+                            if cand[i] != bit:
+                                queue.append((i, bit))
+                            break
+        return True
+
+
+# given a sudoku string, in any format encode accepts,
+# returns the solved sudoku formatted the same way as decode,
+# or an empty string if the puzzle has no solution.
+def solve(sudoku: str) -> str:
+    solution = Solver().solve(cells(sudoku))
+    return to_string(solution) if solution else ""
+
+
+# counts the solutions of a sudoku, stopping once limit solutions are found,
+# so limit=2 is enough to tell if a puzzle's solution is unique.
+# sudoku is either a string, or a list of 81 cell values.
+# returns the count, and the solutions found, formatted the same as decode.
+# Each solution continues the same search where the last one stopped,
+# so finding k solutions costs one search, not k.
+def count(sudoku, limit: int = 2) -> Tuple[int, List[str]]:
+    grid = cells(sudoku) if isinstance(sudoku, str) else sudoku
+    solutions = Solver().first(grid, limit)
+    return len(solutions), [to_string(solution) for solution in solutions]
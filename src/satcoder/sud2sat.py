@@ -1,18 +1,63 @@
+import argparse
 import fileinput
+import os
 import sys
 
-from . import encode
+from . import Encoding, encode
+from .cnf import cells
+
+# environment variable with the path of the model used by -e auto
+MODEL_ENV = "SATSUDOKU_MODEL"
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert a sudoku to CNF")
+    parser.add_argument(
+        "-e",
+        "--enc",
+        default="minimal",
+        choices=[enc.name.lower() for enc in Encoding] + ["auto"],
+        help="encoding to use, auto picks one with a model trained by satmark",
+    )
+    parser.add_argument(
+        "-M",
+        "--model",
+        default=os.environ.get(MODEL_ENV, ""),
+        help=f"model for -e auto (default ${MODEL_ENV})",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="shuffle the clauses, literals and variables with this seed",
+    )
+    args, rest = parser.parse_known_args()
+
     # get the sudoku from stdin
     try:
-        sudoku = "".join(list(fileinput.input()))
+        sudoku = "".join(list(fileinput.input(files=rest)))
     except FileNotFoundError:
         # get from arguments if no input is given
-        sudoku = " ".join(sys.argv[1:])
+        sudoku = " ".join(rest)
+
+    try:
+        grid = cells(sudoku)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        exit(1)
+
+    if args.enc != "auto":
+        encoding = Encoding[args.enc.upper()]
+    elif not args.model:
+        print(f"Error: -e auto needs a model, from -M or ${MODEL_ENV}", file=sys.stderr)
+        exit(1)
+    else:
+        # only -e auto needs the native solver the features are computed with
+        from .features import Selector
+
+        encoding = Selector.load(args.model).choose_encoding(grid)
 
-    print(encode(sudoku))
+    print(encode(grid, encoding, seed=args.seed))
 
 
 if __name__ == "__main__":
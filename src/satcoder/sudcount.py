@@ -0,0 +1,82 @@
+import argparse
+import sys
+from functools import partial
+from multiprocessing import Pool
+
+from .puzzles import load, parse
+from .solver import Solver
+
+# Validates puzzles in bulk by counting their solutions, up to a limit.
+# Prints one line per puzzle: the number of solutions found (a count equal
+# to the limit means "at least that many"), followed by the solutions in
+# the one-line format if -g is given.
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count the solutions of sudoku puzzles, up to a limit"
+    )
+    args = setup_args(parser)
+
+    try:
+        if args.file:
+            grids = load(args.file, args.size, args.offset)
+        else:
+            grids = parse(sys.stdin.buffer.read(), args.size, args.offset)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+
+    check = partial(count_line, limit=args.limit, grids=args.grids)
+    out = sys.stdout
+    with Pool(args.jobs) as p:
+        for line in p.imap(check, grids.tolist(), chunksize=256):
+            out.write(line + "\n")
+
+
+def setup_args(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    parser.add_argument(
+        "file", nargs="?", default="", help="puzzle file, read from stdin if not given"
+    )
+    parser.add_argument(
+        "-k",
+        "--limit",
+        type=__positive,
+        default=2,
+        help="stop counting at this many solutions (default 2, enough for uniqueness)",
+    )
+    parser.add_argument(
+        "-g", "--grids", action="store_true", help="print the solutions found"
+    )
+    parser.add_argument(
+        "--size", type=int, default=1, help="lines per puzzle (default 1)"
+    )
+    parser.add_argument(
+        "--offset", type=int, default=0, help="lines between puzzles (default 0)"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="number of processes to use"
+    )
+    return parser.parse_args()
+
+
+def count_line(grid: list, limit: int, grids: bool) -> str:
+    if not grids:
+        return str(Solver().count(grid, limit))
+    solutions = Solver().first(grid, limit)
+    return " ".join([str(len(solutions))] + ["".join(map(str, s)) for s in solutions])
+
+
+# the limit has to be at least 1, or counting would never stop
+def __positive(value: str) -> int:
+    try:
+        limit = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if limit < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {limit}")
+    return limit
+
+
+if __name__ == "__main__":
+    main()
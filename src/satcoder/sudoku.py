@@ -1,6 +1,9 @@
 # decodes the CNF assignment output from miniSAT
 # and returns the solved sudoku puzzle as a string
-def decode(cnf: str) -> str:
+# seed is the seed of the layout the CNF was encoded with, if any
+def decode(cnf: str, seed=None) -> str:
+    if seed is not None:
+        cnf = __unshuffle(cnf, seed)
     # get the sudoku puzzle from the CNF
     sudoku = __parse(cnf)
     # format the sudoku puzzle
@@ -8,6 +11,12 @@ def decode(cnf: str) -> str:
     return sudoku
 
 
+# formats a list of 81 cell values (row-major order) the same
+# way decode formats a solved puzzle.
+def to_string(cells: list) -> str:
+    return __format([cells[i : i + 9] for i in range(0, 81, 9)])
+
+
 def __parse(cnf: str) -> list:
     # cnf will be a list of variables, apply to each
     # variable the reverse of 81 * (row-1) + 9 * (column-1) + (value - 1) + 1
@@ -27,6 +36,15 @@ def __parse(cnf: str) -> list:
     return sudoku
 
 
+# maps an assignment in the layout for seed back to the canonical
+# numbering, in variable order, the way the solver would have listed it
+def __unshuffle(cnf: str, seed: int) -> str:
+    from .layout import layout
+
+    literals = [layout(seed).original(int(x)) for x in cnf.split() if x != "0"]
+    return " ".join(str(x) for x in sorted(literals, key=abs))
+
+
 def __format(sudoku: list) -> str:
     # format the sudoku puzzle
     # there should be no empty cells because the puzzle is solved
@@ -1,2 +1,24 @@
-from .sattester import TestData, Tester, TestResult
-from .satsolver import SatSolver
\ No newline at end of file
+import importlib
+
+# imported on first use, so running one of the satmark modules (e.g. the
+# stand-in solver) doesn't import the whole benchmark.
+__LAZY = {
+    "TestData": "sattester",
+    "Tester": "sattester",
+    "TestResult": "sattester",
+    "SatSolver": "satsolver",
+}
+
+__all__ = list(__LAZY)
+
+
+def __getattr__(name: str):
+    if name not in __LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{__LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,43 @@
+import os
+from typing import Dict
+
+from satcoder import Encoding, encode_to
+from satcoder.features import Selector
+
+from .satsolver import SatSolver
+from .solvers import default_solver, registry
+from .training import model_path
+
+
+# Chooses the encoding and solver for each puzzle with the model trained by
+# satmark --train, instead of using the same ones for every puzzle. The
+# encoding passed in by the tester is ignored. Members of the model whose
+# solver isn't installed fall back to the default solver.
+class AutoSolver(SatSolver):
+    def __init__(self, pc: int, test: str, enc=Encoding.MINIMAL, solver=None) -> None:
+        super().__init__(pc, test, enc, solver)
+        path = model_path(self.config)
+        if not os.path.isfile(path):
+            print(f"Error: no model at {path}, train one with satmark --train")
+            exit(1)
+        self.__selector = Selector.load(path)
+        self.__solvers = registry(self.config)
+        # the solver chosen for each puzzle file, by file name
+        self.__choices: Dict[str, str] = {}
+
+    def name(self, enc: Encoding) -> str:
+        return "auto"
+
+    def write_input(self, out, puzzle: list, enc: Encoding, cache=None) -> None:
+        member = self.__selector.choose(puzzle).split("-")
+        solver = member[1] if len(member) > 1 else default_solver(self.config)
+        if solver not in self.__solvers or not self.__solvers[solver].available():
+            solver = default_solver(self.config)
+        self.__choices[os.path.basename(out.name)] = solver
+        encode_to(out, puzzle, Encoding[member[0].upper()], cache)
+
+    def _solve_puzzle(self, i):
+        name = f"sudoku_{str(i + 1).zfill(2)}"
+        solver = self.__solvers[self.__choices[f"{name}.{self.EXT}"]]
+        infile = f"{self._in_dir}/{name}.{self.EXT}"
+        return solver.run(infile, f"{self._work_dir}/{name}.out")
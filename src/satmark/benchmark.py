@@ -1,24 +1,26 @@
 import argparse
+import importlib.util
 import os
 import shutil
-from multiprocessing import Pool
-from typing import List
+from typing import TYPE_CHECKING, List
 
 from mdtable import RawTable, MDTable, TableMaker
 from satcoder import Encoding, decode
+from satcoder.incremental import DEFAULT_BACKEND
 
-from .conf import Config
-from .sattester import TestData, Tester, TestResult
+from .conf import load_config
 
-# check if minisat is installed somewhere in $PATH
-# if not, then the solver will not be able to run
-if not shutil.which("minisat"):
-    print("Minisat not found in $PATH. Please install minisat.")
-    exit()
+if TYPE_CHECKING:
+    from .journal import Journal
+    from .sattester import TestResult
 
-# load the config file
-WORKING_DIR = os.getcwd()
-CONFIG = Config(f"{WORKING_DIR}/sat_config.json")
+# The modules of each mode (e.g. portfolio.py for -P) are imported where the
+# mode is run, not here. Between them they import multiprocessing, threading
+# and concurrent.futures, which took most of the time satmark --help did.
+
+# defaults of --shard-size and --lease, see shards.py
+SHARD_SIZE = 1000
+LEASE_SECONDS = 300
 
 
 def main():
@@ -27,19 +29,108 @@ def main():
     args = setup_args(parser)
 
     if args.clean:
-        shutil.rmtree(CONFIG["resultsDir"])
+        shutil.rmtree(load_config()["resultsDir"])
         exit(0)
 
-    all_tests, summarize, keep, decode, markdown = get_arg_opts(args)
+    if args.compare:
+        from .compare import run_compare
+
+        exit(run_compare(*args.compare, args.alpha, args.silent))
 
-    validate_args(all_tests, summarize, args.test, args.enc)
+    config = load_config()
+    if args.train:
+        from .training import run_train
 
-    make_dirs()
+        run_train(config, args.silent)
+        exit(0)
+
+    if args.shard or args.work or args.merge:
+        if args.isolate:
+            # the timing would be of the machine merging, not the workers
+            print("Error: -I cannot be used with --shard, --work or --merge")
+            exit(1)
+        run_sharded(args)
+        exit(0)
+
+    all_tests, summarize, keep, decode, markdown = get_arg_opts(args)
+
+    validate_args(all_tests, summarize, args.test, args.enc, args.solver)
+    if args.portfolio and (all_tests or args.enc or args.solver):
+        print("Error: -P can only be used with -t and -s")
+        exit(1)
+    if args.portfolio and args.resume:
+        print("Error: -P cannot be resumed")
+        exit(1)
+    if args.layouts and (all_tests or args.portfolio or args.resume):
+        print("Error: -L can only be used with -t, -e, -x, --seed and -s")
+        exit(1)
+    if args.layouts and args.enc and args.enc.upper() not in Encoding.__members__:
+        print("Error: -L needs a CNF encoding (minimal, efficient, extended)")
+        exit(1)
+    if args.layouts and args.layouts < 2:
+        print("Error: -L needs at least 2 layouts to measure their spread")
+        exit(1)
+    if args.isolate and args.portfolio:
+        print("Error: -I cannot be used with -P, which runs its members at once")
+        exit(1)
+    if args.isolate and not hasattr(os, "sched_setaffinity"):
+        print("Error: -I needs os.sched_setaffinity, which this platform lacks")
+        exit(1)
+    if args.incremental and (all_tests or args.portfolio or args.layouts):
+        print("Error: --incremental can only be used with -t, -e, -R and -s")
+        exit(1)
+    if args.incremental and (args.solver or args.enc in {"native", "auto"}):
+        print("Error: --incremental uses python-sat, with a CNF encoding and no -x")
+        exit(1)
+    if args.incremental and importlib.util.find_spec("pysat") is None:
+        print("Error: --incremental needs python-sat (satsudoku[incremental])")
+        exit(1)
+    if args.enc == "auto" and args.solver:
+        print("Error: -x cannot be used with -e auto, the model picks the solver")
+        exit(1)
 
-    if all_tests:
-        test_all(summarize, args.silent)
+    # the native and incremental solvers don't need an external SAT solver
+    if all_tests or (args.enc != "native" and not args.incremental):
+        every = all_tests or args.portfolio or bool(args.layouts)
+        check_solvers(args.solver, every)
+
+    make_dirs(args.resume)
+    # before any workers are forked, so they profile themselves too
+    if args.memory:
+        memory_dir = f"{config['resultsDir']}memory/"
+        # profiles are by pid, so the last run's would be mixed in
+        shutil.rmtree(memory_dir, ignore_errors=True)
+        from .memprof import enable as enable_memory
+
+        enable_memory(memory_dir)
+    cores = []
+    if args.isolate:
+        from .timing import enable as enable_timing, fingerprint, pin
+
+        cores = enable_timing(args.idle_siblings)
+        machine = fingerprint()
+        print_if_not(args.silent, f"Running on {machine['cpu']}, cores {cores}")
+        if not all_tests and not args.portfolio:
+            # the solvers run from this process
+            pin(cores[0])
+
+    if args.portfolio:
+        from .portfolio import run_portfolio
+
+        tests = [args.test.capitalize()] if args.test else list(config["puzzleSets"])
+        run_portfolio(config, tests, args.silent)
+    elif args.layouts:
+        from .layouts import members as layout_members, run_layouts
+
+        tests = [args.test.capitalize()] if args.test else list(config["puzzleSets"])
+        study = layout_members(config, args.enc, args.solver)
+        run_layouts(config, tests, study, args.layouts, args.seed, args.silent)
+    elif all_tests:
+        test_all(summarize, args.silent, args.resume, cores)
     else:
-        test_single(args.test, args.enc, args.silent)
+        test_single(
+            args.test, args.enc, args.solver, args.silent, args.resume, args.incremental
+        )
 
     if decode:
         decode_solutions(markdown)
@@ -47,7 +138,7 @@ def main():
     if keep:
         copy_working_dir(args.silent)
     else:
-        shutil.rmtree(CONFIG["cacheDir"])
+        shutil.rmtree(config["cacheDir"])
 
 
 # prepare the arguments for the script
@@ -67,7 +158,14 @@ def setup_args(parser: argparse.ArgumentParser) -> argparse.Namespace:
         "--enc",
         type=str,
         default="",
-        help="encoding to use (minimum, efficient, extended)",
+        help="encoding to use (minimum, efficient, extended, native, auto)",
+    )
+    parser.add_argument(
+        "-x",
+        "--solver",
+        type=str,
+        default="",
+        help="SAT solver to use, from the solvers in the config",
     )
     parser.add_argument("-a", "--all", action="store_true", help="run all tests")
     parser.add_argument(
@@ -94,6 +192,104 @@ def setup_args(parser: argparse.ArgumentParser) -> argparse.Namespace:
         action="store_true",
         help="output solutions in markdown format",
     )
+    parser.add_argument(
+        "-P",
+        "--portfolio",
+        action="store_true",
+        help="race all encodings and solvers on each puzzle, first answer wins",
+    )
+    parser.add_argument(
+        "-C",
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        help="compare the results in two results directories and exit",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="significance level for --compare (default 0.05)",
+    )
+    parser.add_argument(
+        "--train",
+        action="store_true",
+        help="train the model for -e auto from the results directory and exit",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="QUEUE",
+        help="split a run of all tests into shards in QUEUE, for --work",
+    )
+    parser.add_argument(
+        "--work",
+        metavar="QUEUE",
+        help="solve shards from QUEUE until there are none left",
+    )
+    parser.add_argument(
+        "--merge",
+        metavar="QUEUE",
+        help="write the reports of the solved shards in QUEUE",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=SHARD_SIZE,
+        help=f"puzzles per shard (default {SHARD_SIZE})",
+    )
+    parser.add_argument(
+        "--lease",
+        type=float,
+        default=LEASE_SECONDS,
+        help="seconds before a dead worker's shard is retried "
+        f"(default {LEASE_SECONDS})",
+    )
+    parser.add_argument(
+        "-R",
+        "--resume",
+        action="store_true",
+        help="resume an interrupted run, skipping puzzles already in its journal",
+    )
+    parser.add_argument(
+        "-L",
+        "--layouts",
+        type=int,
+        default=0,
+        metavar="K",
+        help="solve every puzzle under K shuffled CNF layouts and report the spread",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed of the first layout for -L (default 0)",
+    )
+    parser.add_argument(
+        "--incremental",
+        nargs="?",
+        const=DEFAULT_BACKEND,
+        default="",
+        metavar="BACKEND",
+        help="solve with one long lived python-sat solver per encoding, clues as "
+        f"assumptions (default backend {DEFAULT_BACKEND})",
+    )
+    parser.add_argument(
+        "-I",
+        "--isolate",
+        action="store_true",
+        help="pin solvers to their own cores, calibrate, and fingerprint the machine",
+    )
+    parser.add_argument(
+        "--idle-siblings",
+        action="store_true",
+        help="with -I, leave the hyperthread siblings of the cores used idle",
+    )
+    parser.add_argument(
+        "-M",
+        "--memory",
+        action="store_true",
+        help="profile the memory used by each phase of the run, see memprof.py",
+    )
     return parser.parse_args()
 
 
@@ -103,68 +299,212 @@ def get_arg_opts(args):
     # all other arguments are performed, unless they are also specified.
     # (this way, can say do all tests, but don't summarize, instead of
     # having to specify all the other arguments except summarize)
-    opts = (args.All, args.summarize, args.keep, args.decode, args.markdown)
+    opts = (args.all, args.summarize, args.keep, args.decode, args.markdown)
     return (True, ) + tuple(not x for x in opts[1:]) if args.All else opts
 
 
-def validate_args(all_tests, summarize, test, enc):
+def validate_args(all_tests, summarize, test, enc, solver):
     if summarize and not all_tests:
         print("Error: -S must be used with -a")
         exit(1)
 
-    if all_tests and (test != "" or enc != ""):
+    if all_tests and (test != "" or enc != "" or solver != ""):
         print("Error: -a/-C cannot be used with flags other -s")
         exit(1)
 
 
-# make the output directories if they don't exist
-def make_dirs() -> None:
-    if os.path.isdir(CONFIG["cacheDir"]):
-        shutil.rmtree(CONFIG["cacheDir"])
-    os.mkdir(CONFIG["cacheDir"])
-    if not os.path.isdir(CONFIG["resultsDir"]):
-        os.mkdir(CONFIG["resultsDir"])
+# --shard, --work and --merge, see shards.py
+def run_sharded(args) -> None:
+    from .journal import Journal
+    from .shards import create_shards, members, merge_results, run_solvers
+    from .shards import run_worker
+
+    config = load_config()
+    if args.shard:
+        check_solvers("", every=True)
+        count = create_shards(config, args.shard, members(config), args.shard_size)
+        print_if_not(args.silent, f"Wrote {count} shards to {args.shard}")
+    elif args.work:
+        # workers on the same machine share the cache, so it isn't cleared
+        os.makedirs(config["cacheDir"], exist_ok=True)
+        count = run_worker(config, args.work, args.lease, args.silent)
+        print_if_not(args.silent, f"No shards left, solved {count}")
+    else:
+        make_dirs()
+        count = merge_results(args.merge, Journal(journal_dir()))
+        print_if_not(args.silent, f"Merged {count} results from {args.merge}")
+        # every puzzle is in the journal now, so this only writes the reports,
+        # for the solvers the workers ran rather than the ones installed here
+        solvers = run_solvers(args.merge)
+        test_all(args.summarize, args.silent, resume=True, solvers=solvers)
+        shutil.rmtree(config["cacheDir"])
+
+
+# check the SAT solvers that will run are installed somewhere in $PATH, and
+# exit if they aren't. A single test runs solver, or the default solver if
+# none is given. With every (-a, -P, -L and --shard), every installed solver
+# is run, so the missing ones are skipped, but at least one is needed.
+def check_solvers(solver: str, every: bool = False) -> None:
+    from .solvers import default_solver, registry
+
+    config = load_config()
+    solvers = registry(config)
+    if solver and solver not in solvers:
+        print(f"Error: unknown solver {solver}")
+        exit(1)
+    if every and not solver:
+        for name, s in solvers.items():
+            if not s.available():
+                print(f"{s.command[0]} not found in $PATH, skipping {name}.")
+        if not available_solvers():
+            print("Error: none of the configured SAT solvers are installed")
+            exit(1)
+        return
+    name = solver or default_solver(config)
+    if name not in solvers:
+        print(f"Error: unknown default solver {name}")
+        exit(1)
+    if not solvers[name].available():
+        command = solvers[name].command[0]
+        print(f"Error: {command} not found in $PATH. Please install {name}.")
+        exit(1)
+
+
+# names of the configured solvers that can be run
+def available_solvers() -> List[str]:
+    from .solvers import registry
+
+    return [name for name, s in registry(load_config()).items() if s.available()]
+
+
+# make the output directories if they don't exist. Unless resuming, the
+# cache and the journal of the last run are cleared first.
+def make_dirs(resume: bool = False) -> None:
+    config = load_config()
+    if not resume:
+        if os.path.isdir(config["cacheDir"]):
+            shutil.rmtree(config["cacheDir"])
+        if os.path.isdir(journal_dir()):
+            shutil.rmtree(journal_dir())
+    os.makedirs(config["cacheDir"], exist_ok=True)
+    os.makedirs(config["resultsDir"], exist_ok=True)
+
+
+# where the journal of finished puzzles is kept, see journal.py
+def journal_dir() -> str:
+    return f"{load_config()['resultsDir']}journal/"
+
+
+# the journal for this run, with the results of the run being resumed
+def open_journal(resume: bool, silent: bool) -> "Journal":
+    from .journal import Journal, load_journal
+
+    done = load_journal(journal_dir()) if resume else {}
+    if resume:
+        count = sum(len(rows) for rows in done.values())
+        print_if_not(silent, f"Resuming, {count} results already in the journal")
+    return Journal(journal_dir(), done)
 
 
 # identify and run tests based on the arguments passed
-def test_single(test, enc, silent) -> None:
-    if not enc:
+# incremental is the python-sat backend to solve with, see incrementalsolver.py
+def test_single(test, enc, solver, silent, resume=False, incremental="") -> None:
+    if not enc or enc in {"native", "auto"}:
         encoding = Encoding.MINIMAL
     elif enc in {"minimal", "efficient", "extended"}:
         encoding = Encoding[enc.upper()]
     else:
         print("Error: invalid encoding")
         exit(1)
-    test = test.capitalize() if test else CONFIG["defaultPuzzleSet"]
+    from .sattester import TestData, Tester
+
+    config = load_config()
+    test = test.capitalize() if test else config["defaultPuzzleSet"]
     tester = Tester()
-    tester.update_params(TestData(silent, test, encoding, *CONFIG.puzzle_values(test)))
+    tester.update_params(TestData(silent, test, encoding, *config.puzzle_values(test)))
+    if enc == "native":
+        from .nativesolver import NativeSolver
+
+        tester.update_solver(NativeSolver)
+    elif enc == "auto":
+        from .autosolver import AutoSolver
+
+        tester.update_solver(AutoSolver)
+    elif incremental:
+        from .incrementalsolver import IncrementalSatSolver
+
+        tester.update_solver(IncrementalSatSolver, incremental)
+    elif solver:
+        from .satsolver import SatSolver
+
+        tester.update_solver(SatSolver, solver)
+    tester.journal = open_journal(resume, silent)
 
-    out = f"{CONFIG['resultsDir']}test_results.md"
+    out = f"{config['resultsDir']}test_results.md"
     run_tester(tester, out=out)
 
 
 # run all tests and output results to a markdown file, optionally summarize
 # results from all tests. Tests are run in parallel using a pool of processes.
-def test_all(summary: bool = False, silent: bool = False) -> None:
-    out = CONFIG["resultsDir"]
+# if cores are given, each worker is pinned to one of them, see timing.py.
+# solvers are the SAT solvers to run, every installed one by default.
+def test_all(
+    summary: bool = False, silent: bool = False, resume=False, cores=None, solvers=None
+) -> None:
+    from functools import partial
+    from multiprocessing import Manager, Pool, Value, cpu_count
+
+    from .metrics import Metrics, Reporter, progress_line
+    from .sattester import TestData, Tester
+
+    config = load_config()
+    out = config["resultsDir"]
     print_if_not(silent, f"Running all tests, outputting to {out}")
     print_if_not(silent, "This may take a while...")
 
+    journal = open_journal(resume, silent)
     # prepare a tester instance for each test
     testers = []
-    for test in CONFIG["puzzleSets"]:
+    for test in config["puzzleSets"]:
         new_tester = Tester()
         new_tester.update_params(
-            TestData(True, test, Encoding.MINIMAL, *CONFIG.puzzle_values(test))
+            TestData(True, test, Encoding.MINIMAL, *config.puzzle_values(test))
         )
+        new_tester.journal = journal
         testers.append(new_tester)
 
+    # every tester runs each encoding with each solver, and the native solver
+    solvers = available_solvers() if solvers is None else solvers
+    members = len(Encoding) * len(solvers) + 1
+    total = sum(t.puzzle_count() for t in testers) * members
+    total = max(total - sum(len(rows) for rows in journal.done.values()), 0)
+    workers = len(cores) if cores else cpu_count()
+    metrics = Metrics(total, workers, config.get("metrics", {}))
+
     # divide these testers among a pool of processes for parallelization.
     # this optimizes around having a large number of tests, but if there are
     # few tests with lots of puzzles, this won't be as effective.
     # (break large datasets into smaller ones to improve performance)
-    with Pool() as p:
-        results = p.map(run_tester, testers)
+    # each worker pins itself to the next core, in the order they start
+    initializer, initargs = None, ()
+    if cores:
+        from .timing import pin_worker
+
+        initializer, initargs = pin_worker, (cores, Value("i", 0))
+    with Manager() as manager, Pool(workers, initializer, initargs) as p:
+        events = manager.Queue()
+        for tester in testers:
+            tester.reporter = Reporter(events)
+        pending = p.map_async(partial(run_tester, solvers=solvers), testers)
+        # report progress from the main process while the pool works
+        while not pending.ready():
+            metrics.drain(events)
+            snap = metrics.tick()
+            if snap:
+                print_if_not(silent, progress_line(snap))
+        metrics.drain(events, timeout=0)
+        metrics.emit()
+        results = pending.get()
         # flatten list of lists from map. Each tester returns a list of TestResults
         # for each encoding tested, so we need to flatten this to a single list.
         results = [item for sublist in results for item in sublist]
@@ -184,29 +524,36 @@ def prepare_summary(results, silent, out):
     print_if_not(silent, f"Summary saved to {out}summary.md")
 
 
-# runs a single tester instance
-def run_tester(tester, out=None) -> List[TestResult]:
+# runs a single tester instance, with every installed solver or solvers
+def run_tester(tester, out=None, solvers=None) -> List["TestResult"]:
+    from .nativesolver import NativeSolver
+    from .satsolver import SatSolver
+
     if out:
         return tester.test(out)
-    out = f"{CONFIG['resultsDir']}"
+    out = f"{load_config()['resultsDir']}"
     result = []
-    for enc in Encoding:
-        tester.update_encoding(enc)
-        # give the tester a number to use for the test, (i) so that it can cache
-        # its fixed encodings in it's own file and not run into a problem where two processes
-        # are using the same cache file at the same time.
-        result.append(
-            tester.test(f"{out}{tester.test_name().lower()}-{enc.name.lower()}.md")
-        )
+    # run every encoding with every solver, so the same CNFs are solved by each
+    for solver in available_solvers() if solvers is None else solvers:
+        tester.update_solver(SatSolver, solver)
+        for enc in Encoding:
+            tester.update_encoding(enc)
+            name = tester.solver.name(enc)
+            result.append(tester.test(f"{out}{tester.test_name().lower()}-{name}.md"))
+    # the native solver runs last, as a baseline to compare the encodings to
+    tester.update_solver(NativeSolver)
+    result.append(tester.test(f"{out}{tester.test_name().lower()}-native.md"))
     return result
 
 
 def write_summary(averages: RawTable, maxes: RawTable, mins: RawTable) -> None:
-    sum_file = f"{CONFIG['resultsDir']}summary.md"
+    from .memprof import phase
+
+    sum_file = f"{load_config()['resultsDir']}summary.md"
     # header is generated from the keys of the puzzles dict,
     # this allows for easy addition of tests with new puzzles
     # and the summary will automatically update
-    puzzle_sets = tuple(CONFIG["puzzleSets"].keys())
+    puzzle_sets = tuple(load_config()["puzzleSets"].keys())
 
     def header_func(x):
         return f"{puzzle_sets[x-1]} Puzzles"
@@ -220,10 +567,13 @@ def write_summary(averages: RawTable, maxes: RawTable, mins: RawTable) -> None:
         "CPU Time (seconds)",
     ]
     with open(sum_file, "w") as f:
-        maker = TableMaker(sep_every=3, sep_func=header_func, new_line=False)
-        f.write(maker.table("Minimum Values", mins, cols))
-        f.write(maker.table("Maximum Values", maxes, cols))
-        f.write(maker.table("Average Values", averages, cols))
+        # one row per encoding (and the native solver) for each puzzle set
+        per_set = len(mins) // len(puzzle_sets)
+        maker = TableMaker(sep_every=per_set, sep_func=header_func, new_line=False)
+        with phase("report"):
+            f.write(maker.table("Minimum Values", mins, cols))
+            f.write(maker.table("Maximum Values", maxes, cols))
+            f.write(maker.table("Average Values", averages, cols))
         
 
 
@@ -232,20 +582,21 @@ def print_if_not(b: bool, str: str) -> None:
 
 
 def copy_solution_dir(silent: bool) -> None:
-    out_dir: str = CONFIG["resultsDir"]
+    out_dir: str = load_config()["resultsDir"]
     # add trailing slash if not present
     if out_dir[-1] != "/":
         out_dir += "/"
     if os.path.isdir(f"{out_dir}solutions"):
         shutil.rmtree(f"{out_dir}solutions")
-    shutil.move(f"{CONFIG['cacheDir']}solutions", out_dir)
+    shutil.move(f"{load_config()['cacheDir']}solutions", out_dir)
 
     print_if_not(silent, f"Decoded solutions written to {out_dir}solutions")
 
 
 def copy_working_dir(silent: bool) -> None:
-    cache_dir = CONFIG["cacheDir"]
-    out_dir = CONFIG["resultsDir"]
+    config = load_config()
+    cache_dir = config["cacheDir"]
+    out_dir = config["resultsDir"]
     # add trailing slash if not present
     if out_dir[-1] != "/":
         out_dir += "/"
@@ -275,16 +626,21 @@ def copy_working_dir(silent: bool) -> None:
 
 
 def decode_solutions(markdown: bool) -> None:
+    from .memprof import phase
+
     # decode solutions from minisat output
-    for test in CONFIG["puzzleSets"]:
+    config = load_config()
+    for test in config["puzzleSets"]:
         test = test.lower()
-        in_dir = f"{CONFIG['cacheDir']}sat/{test}/"
+        in_dir = f"{config['cacheDir']}sat/{test}/"
         if os.path.exists(in_dir):
-            decode_dir(f"solutions/{test}/", in_dir, markdown)
+            with phase("decode"):
+                decode_dir(f"solutions/{test}/", in_dir, markdown)
 
 
 def decode_dir(out_dir: str, in_dir: str, markdown: bool) -> None:
-    os.system(f"mkdir -p {CONFIG['cacheDir']}{out_dir}")
+    cache_dir = load_config()["cacheDir"]
+    os.system(f"mkdir -p {cache_dir}{out_dir}")
     # count how many files are in standard_dir
     count = len(list(os.listdir(in_dir)))
     maker = TableMaker()
@@ -296,7 +652,7 @@ def decode_dir(out_dir: str, in_dir: str, markdown: bool) -> None:
 
             sudoku = decode(lines[1])
 
-            outfile = f"{CONFIG['cacheDir']}{out_dir}sudoku_{str(i + 1).zfill(2)}"
+            outfile = f"{cache_dir}{out_dir}sudoku_{str(i + 1).zfill(2)}"
 
             output = (
                 sudoku_to_table(sudoku, f"Solution {str(i+1).zfill(2)}", maker)
@@ -0,0 +1,185 @@
+import glob
+import json
+import math
+import os
+import random
+from typing import Dict, List, Tuple
+
+from mdtable import TableMaker
+
+# Compares two sets of satmark results, e.g. from two solver builds or two
+# machines. Results are read from the .json files satmark writes next to
+# its markdown tables, and paired by (puzzle set, encoding, puzzle number).
+# For every (set, encoding) pair, the CPU times of the baseline (a) and the
+# candidate (b) are compared with a Wilcoxon signed-rank test, and a
+# bootstrap confidence interval of the mean time ratio b/a.
+
+Key = Tuple[str, str]
+
+# times are floored to this, minisat reports fast puzzles as 0 seconds
+MIN_TIME = 1e-6
+BOOTSTRAP_SAMPLES = 2000
+
+
+# returns {(set, encoding): {puzzle: time}} for every result file in
+# directory. Raises ValueError if two files have results for the same set and
+# encoding (e.g. a test_results.json left by a single test, next to the
+# results of -a), since it can't tell which of them to compare.
+def load_results(directory: str) -> Dict[Key, Dict[int, float]]:
+    results = {}
+    sources: Dict[Key, str] = {}
+    for filename in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or "puzzles" not in data:
+            continue
+        key = (data["set"], data["encoding"])
+        if key in sources:
+            raise ValueError(
+                f"{sources[key]} and {filename} both have results for "
+                f"{key[0]} with {key[1]}, remove one of them"
+            )
+        sources[key] = filename
+        results[key] = {
+            p["puzzle"]: max(p["time"], MIN_TIME) for p in data["puzzles"]
+        }
+    return results
+
+
+# two sided p-value of the Wilcoxon signed-rank test on paired samples,
+# using the normal approximation with tie correction.
+def wilcoxon(a: List[float], b: List[float]) -> float:
+    diffs = [y - x for x, y in zip(a, b) if y != x]
+    n = len(diffs)
+    if n == 0:
+        return 1.0
+    ordered = sorted(range(n), key=lambda i: abs(diffs[i]))
+    ranks = [0.0] * n
+    tie_term = 0
+    i = 0
+    while i < n:
+        # cells with the same absolute difference share the average rank
+        j = i
+        while j + 1 < n and abs(diffs[ordered[j + 1]]) == abs(diffs[ordered[i]]):
+            j += 1
+        for k in range(i, j + 1):
+            ranks[ordered[k]] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    w_plus = sum(r for r, d in zip(ranks, diffs) if d > 0)
+    mean = n * (n + 1) / 4
+    var = n * (n + 1) * (2 * n + 1) / 24 - tie_term / 48
+    if var <= 0:
+        return 1.0
+    # continuity correction
+    z = (abs(w_plus - mean) - 0.5) / math.sqrt(var)
+    return math.erfc(max(z, 0) / math.sqrt(2))
+
+
+# mean time ratio b/a, and its bootstrap confidence interval,
+# computed on log ratios so speedups and slowdowns are symmetric.
+def bootstrap(
+    a: List[float], b: List[float], confidence: float = 0.95, seed: int = 0
+) -> Tuple[float, float, float]:
+    logs = [math.log(y / x) for x, y in zip(a, b)]
+    rng = random.Random(seed)
+    n = len(logs)
+    means = sorted(
+        sum(rng.choice(logs) for _ in range(n)) / n for _ in range(BOOTSTRAP_SAMPLES)
+    )
+    tail = (1 - confidence) / 2
+    low = means[int(tail * (BOOTSTRAP_SAMPLES - 1))]
+    high = means[int((1 - tail) * (BOOTSTRAP_SAMPLES - 1))]
+    return math.exp(sum(logs) / n), math.exp(low), math.exp(high)
+
+
+# compare the results in directories a and b, returns the table rows and
+# whether any (set, encoding) pair got significantly slower in b.
+def compare(a_dir: str, b_dir: str, alpha: float = 0.05) -> Tuple[list, bool]:
+    a_results, b_results = load_results(a_dir), load_results(b_dir)
+    rows, regression = [], False
+    for key in sorted(a_results.keys() & b_results.keys()):
+        a, b = a_results[key], b_results[key]
+        puzzles = sorted(a.keys() & b.keys())
+        if not puzzles:
+            continue
+        a_times = [a[p] for p in puzzles]
+        b_times = [b[p] for p in puzzles]
+        p_value = wilcoxon(a_times, b_times)
+        ratio, low, high = bootstrap(a_times, b_times, 1 - alpha)
+
+        if p_value < alpha and low > 1:
+            verdict = "Slower"
+            regression = True
+        elif p_value < alpha and high < 1:
+            verdict = "Faster"
+        else:
+            verdict = "No change"
+
+        rows.append(
+            (
+                key[0],
+                key[1],
+                len(puzzles),
+                f"{1 / ratio:.3f}x",
+                f"{1 / high:.3f}x - {1 / low:.3f}x",
+                f"{p_value:.4f}",
+                verdict,
+            )
+        )
+    return rows, regression
+
+
+# prints the comparison as a markdown table, and returns the exit code
+# satmark should use: 1 if anything regressed significantly, 0 otherwise.
+def run_compare(a_dir: str, b_dir: str, alpha: float, silent: bool) -> int:
+    try:
+        rows, regression = compare(a_dir, b_dir, alpha)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    if not rows:
+        print(f"Error: no matching results found in {a_dir} and {b_dir}")
+        return 1
+
+    cols = (
+        "Puzzle Set",
+        "Encoding",
+        "Puzzles",
+        "Speedup",
+        f"{round((1 - alpha) * 100)}% Interval",
+        "p-value",
+        "Result",
+    )
+    if not silent:
+        # without a separator function, the first row is used as the header
+        maker = TableMaker(new_line=False)
+        print(maker.table(f"Comparison of {b_dir} against {a_dir}", [cols] + rows))
+        for warning in timing_warnings(a_dir, b_dir):
+            print(f"Warning: {warning}")
+    return 1 if regression else 0
+
+
+# warnings about how the results were timed, from the timing satmark -I
+# saves with them: if they came from different kinds of machine, or any
+# of them were flagged as noisy.
+def timing_warnings(a_dir: str, b_dir: str) -> List[str]:
+    warnings = []
+    machines = {}
+    for directory in (a_dir, b_dir):
+        kinds, noisy = set(), 0
+        for filename in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            with open(filename, "r") as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or not data.get("timing"):
+                continue
+            machine = data["timing"]["machine"]
+            kinds.add((machine["cpu"], machine["kernel"], machine["governor"]))
+            noisy += bool(data["timing"]["noisy"])
+        machines[directory] = kinds
+        if noisy:
+            warnings.append(f"{noisy} results in {directory} were flagged as noisy")
+    if machines[a_dir] and machines[b_dir] and machines[a_dir] != machines[b_dir]:
+        warnings.append(f"{a_dir} and {b_dir} were run on different machines")
+    return warnings
@@ -1,9 +1,19 @@
+import functools
 import json
 import os
 
 
 REQUIRED_KEYS = ["puzzleDir", "cacheDir", "defaultPuzzleSet", "puzzleSets"]
 REQUIRED_PUZZLE_KEYS = ["file", "numPuzzles", "offset", "size"]
+CONFIG_FILE = "sat_config.json"
+
+
+# the config in the working directory. It is only loaded the first time it
+# is needed, so e.g. --help and --compare work without one, and everything
+# in the process shares the same copy after that.
+@functools.lru_cache(maxsize=None)
+def load_config() -> "Config":
+    return Config(f"{os.getcwd()}/{CONFIG_FILE}")
 
 
 # Wrapper around dict that loads a json file and validates it on init, and
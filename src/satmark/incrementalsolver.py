@@ -0,0 +1,64 @@
+from typing import Dict
+
+from satcoder import Encoding
+from satcoder.incremental import DEFAULT_BACKEND, IncrementalSolver
+
+from .satsolver import SatSolver
+
+
+# Solves puzzles with satcoder.incremental: the rules of each encoding are
+# loaded once into a long lived python-sat solver, which is kept for every
+# puzzle set the tester runs, and each puzzle's clues are passed as
+# assumptions, so what the solver learns carries over between puzzles.
+# The input files only hold the encoding and the clues, since the rules
+# are already loaded. The stats in each row are for that puzzle alone.
+class IncrementalSatSolver(SatSolver):
+    EXT = "clues"
+
+    # solver is the python-sat backend to use, not one from the config
+    def __init__(self, pc: int, test: str, enc=Encoding.MINIMAL, solver=None) -> None:
+        self.backend = solver or DEFAULT_BACKEND
+        super().__init__(pc, test, enc)
+        self.__solvers: Dict[Encoding, IncrementalSolver] = {}
+
+    def name(self, enc: Encoding) -> str:
+        return f"{enc.name.lower()}-incremental"
+
+    # the encoding on the first line, and the cell values on the second
+    def write_input(self, out, puzzle: list, enc: Encoding, cache=None) -> None:
+        out.write(f"{enc.name}\n{''.join(map(str, puzzle))}\n".encode())
+
+    def _solve_puzzle(self, i):
+        filename = f"{self._in_dir}/sudoku_{str(i + 1).zfill(2)}.{self.EXT}"
+        outfile = f"{self._work_dir}/sudoku_{str(i + 1).zfill(2)}.out"
+        with open(filename, "r") as f:
+            enc, grid = f.read().split()
+        model, stats = self.__solver(Encoding[enc]).solve([int(c) for c in grid])
+
+        # write the model the same way minisat does, so it can be decoded
+        with open(outfile, "w") as out:
+            if model is None:
+                out.write("UNSAT\n")
+            else:
+                out.write("SAT\n" + " ".join(map(str, model)) + " 0\n")
+
+        elapsed = stats["time"]
+        decisions = int(stats.get("decisions", 0))
+        props = int(stats.get("propagations", 0))
+
+        def rate(x: int) -> str:
+            return str(round(x / elapsed)) if elapsed else "0"
+
+        return (
+            str(decisions),
+            rate(decisions),
+            str(props),
+            rate(props),
+            f"{elapsed:.6f}",
+        )
+
+    # the long lived solver for an encoding, created on first use
+    def __solver(self, enc: Encoding) -> IncrementalSolver:
+        if enc not in self.__solvers:
+            self.__solvers[enc] = IncrementalSolver(enc, self.backend)
+        return self.__solvers[enc]
@@ -0,0 +1,95 @@
+import glob
+import json
+import os
+import time
+from typing import Dict, Tuple
+
+# Write-ahead journal of finished puzzles, so a run that dies part way
+# through can be picked up again with --resume instead of starting over.
+# Every result row is appended to the journal as soon as the puzzle is
+# solved, as a JSON line with the puzzle set, the member that solved it
+# (the label used in the reports, e.g. "Minimal-standin") and the puzzle's
+# index. Each process writes to its own file in the journal directory, so
+# lines from different workers never interleave.
+#
+# Lines are flushed as they are written, but only fsynced every SYNC_EVERY
+# lines or SYNC_INTERVAL seconds, whichever comes first, and when a member
+# finishes a puzzle set. A crash can lose the last few results, which are
+# then solved again, but never leaves a result half written: a torn last
+# line is skipped when the journal is read back.
+
+SYNC_EVERY = 32
+SYNC_INTERVAL = 1.0
+
+Key = Tuple[str, str]
+
+
+class Journal:
+    # done is what was already in the journal when the run started (see
+    # load_journal), the puzzles that don't need to be solved again.
+    def __init__(self, directory: str, done=None) -> None:
+        self.directory = directory
+        self.done: Dict[Key, Dict[int, tuple]] = done or {}
+        # the file is opened on first use, in the process that writes to it,
+        # since the journal is pickled along with the Tester it belongs to.
+        self.__fd = None
+        self.__pid = None
+        self.__pending = 0
+        self.__synced = 0.0
+
+    def record(self, test: str, member: str, puzzle: int, row: tuple) -> None:
+        fd = self.__file()
+        line = {"set": test, "member": member, "puzzle": puzzle, "row": list(row)}
+        os.write(fd, (json.dumps(line) + "\n").encode())
+        self.__pending += 1
+        if (
+            self.__pending >= SYNC_EVERY
+            or time.monotonic() - self.__synced >= SYNC_INTERVAL
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        if self.__fd is not None and self.__pending:
+            os.fsync(self.__fd)
+        self.__pending = 0
+        self.__synced = time.monotonic()
+
+    # the rows already in the journal for a member on a puzzle set,
+    # by puzzle index
+    def completed(self, test: str, member: str) -> Dict[int, tuple]:
+        return self.done.get((test, member), {})
+
+    def __file(self) -> int:
+        if self.__fd is None or self.__pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            # a new file every run, so nothing is appended to a torn line
+            name = f"{os.getpid()}-{time.time_ns()}.jsonl"
+            path = os.path.join(self.directory, name)
+            self.__fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            self.__pid = os.getpid()
+            self.__synced = time.monotonic()
+        return self.__fd
+
+    # the open file can't be pickled, the copy opens its own
+    def __getstate__(self) -> dict:
+        return {"directory": self.directory, "done": self.done}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["directory"], state["done"])
+
+
+# returns {(set, member): {puzzle: row}} for every line in the journal
+def load_journal(directory: str) -> Dict[Key, Dict[int, tuple]]:
+    results: Dict[Key, Dict[int, tuple]] = {}
+    for filename in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(filename, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn write from a crash
+                    continue
+                key = (entry["set"], entry["member"])
+                results.setdefault(key, {})[entry["puzzle"]] = tuple(entry["row"])
+    return results
+
@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+import statistics
+from typing import Dict, List, Optional
+
+from mdtable import TableMaker
+from satcoder import Encoding, decode, encode_to
+from satcoder.puzzles import load
+
+from .portfolio import Member
+from .solvers import member_name, registry
+from .timing import check as check_timing
+
+# Layout study. Solvers are sensitive to the order of the clauses, the
+# order of the literals in each clause, and how the variables are numbered,
+# none of which change the problem (see satcoder/layout.py). Every puzzle
+# is solved in its canonical layout, as sud2sat writes it, and under K
+# seeded layouts, with seeds seed..seed+K-1. The spread of the CPU times
+# across layouts shows how much of the difference between two encodings
+# could be layout luck, and the layout with the lowest total time is the
+# one to ship, if it beats the canonical one.
+#
+# Each assignment is decoded with the seed its CNF was written with and
+# checked against the puzzle's clues, so a layout that changes the answer
+# would be caught.
+
+
+# the encodings and solvers to study, every encoding with every installed
+# solver, unless limited to one with enc or solver
+def members(config, enc: str = "", solver: str = "") -> List[Member]:
+    solvers = [
+        s
+        for name, s in registry(config).items()
+        if s.available() and (not solver or name == solver)
+    ]
+    encodings = [Encoding[enc.upper()]] if enc else list(Encoding)
+    return [
+        Member(member_name(e, s.name, config), e, s)
+        for s in solvers
+        for e in encodings
+    ]
+
+
+# solves every puzzle in the puzzle sets in tests with every member, in the
+# canonical layout and k seeded ones, writing the spread of the times to
+# [set]-layouts.md, and every time to [set]-layouts.json.
+def run_layouts(
+    config, tests: List[str], study: List[Member], k: int, seed: int, silent: bool
+) -> None:
+    if not study:
+        print("Error: no encodings with an installed solver to study")
+        exit(1)
+    seeds = list(range(seed, seed + k))
+    out = config["resultsDir"]
+    for test in tests:
+        path, count, offset, size = config.puzzle_values(test)
+        grids = load(path, size, offset, count).tolist()
+        # the machine and calibration before the set is solved, with -I
+        timing = check_timing()
+        results = {}
+        for m in study:
+            work_dir = f"{config['cacheDir']}layouts/{test.lower()}/{m.name}"
+            os.makedirs(work_dir, exist_ok=True)
+            puzzles = []
+            for i, grid in enumerate(grids):
+                times = [solve(grid, m, layout, work_dir) for layout in [None] + seeds]
+                puzzles.append(
+                    {"puzzle": i + 1, "canonical": times[0], "times": times[1:]}
+                )
+                None if silent else print(f"{test} {m.name} {i + 1}/{len(grids)}")
+            shutil.rmtree(work_dir)
+            results[m.name] = puzzles
+
+        tables = "".join(
+            layout_tables(test, name, seeds, puzzles)
+            for name, puzzles in results.items()
+        )
+        None if silent else print(tables)
+        with open(f"{out}{test.lower()}-layouts.md", "w") as f:
+            f.write(tables)
+        with open(f"{out}{test.lower()}-layouts.json", "w") as f:
+            data = {"set": test, "seeds": seeds, "members": results}
+            if timing:
+                data["timing"] = timing
+            json.dump(data, f)
+    None if silent else print(f"Layout results saved to {out}")
+
+
+# solves grid with member m in the layout for seed (None for the canonical
+# layout), returns the CPU time, or None if the solver didn't find the
+# puzzle's solution.
+def solve(grid: list, m: Member, seed: Optional[int], work_dir: str) -> Optional[float]:
+    label = "canonical" if seed is None else f"seed-{seed}"
+    infile, outfile = f"{work_dir}/{label}.cnf", f"{work_dir}/{label}.out"
+    with open(infile, "wb") as f:
+        encode_to(f, grid, m.enc, seed=seed)
+    stats = m.solver.run(infile, outfile)
+    if not os.path.isfile(outfile):
+        return None
+    with open(outfile, "r") as f:
+        lines = f.read().split("\n")
+    if len(lines) < 2 or lines[0] != "SAT":
+        return None
+    return float(stats[4]) if __matches(grid, decode(lines[1], seed)) else None
+
+
+# the tables for one member: the spread of each puzzle's times across the
+# seeded layouts, and the total time of each layout
+def layout_tables(test: str, name: str, seeds: List[int], puzzles: List[dict]) -> str:
+    maker = TableMaker(new_line=True)
+    cols = ("Puzzle", "Canonical", "Mean", "Std Dev", "CV", "Min", "Max")
+    rows = [cols]
+    cvs = []
+    for p in puzzles:
+        times = [t for t in p["times"] if t is not None]
+        if len(times) < 2:
+            # not enough layouts solved it to tell how they vary
+            rows.append(
+                (f"Test {str(p['puzzle']).zfill(2)}", __time(p["canonical"]))
+                + ("",) * (len(cols) - 2)
+            )
+            continue
+        mean, stdev = statistics.mean(times), statistics.stdev(times)
+        cv = stdev / mean if mean else 0.0
+        cvs.append(cv)
+        rows.append(
+            (
+                f"Test {str(p['puzzle']).zfill(2)}",
+                __time(p["canonical"]),
+                __time(mean),
+                __time(stdev),
+                f"{cv:.1%}",
+                __time(min(times)),
+                __time(max(times)),
+            )
+        )
+    title = f"{test} {name.capitalize()} Layouts"
+    if cvs:
+        title += f" (mean CV {statistics.mean(cvs):.1%})"
+    tables = maker.table(title, rows)
+
+    totals: Dict[str, Optional[float]] = {}
+    totals["canonical"] = __total([p["canonical"] for p in puzzles])
+    for j, seed in enumerate(seeds):
+        totals[f"seed {seed}"] = __total([p["times"][j] for p in puzzles])
+    canonical = totals["canonical"]
+    ranked = sorted(totals.items(), key=lambda x: (x[1] is None, x[1] or 0.0))
+    rows = [("Layout", "Total CPU Time (sec)", "vs Canonical")]
+    for layout, total in ranked:
+        change = ""
+        if total is not None and canonical:
+            change = f"{total / canonical - 1:+.1%}"
+        rows.append((layout, "failed" if total is None else __time(total), change))
+    return tables + maker.table(f"{test} {name.capitalize()} Layout Totals", rows)
+
+
+# whether a decoded solution has every clue of grid in place
+def __matches(grid: list, solution: str) -> bool:
+    digits = [int(c) for c in solution if c.isdigit()]
+    return len(digits) == 81 and all(c in (0, d) for c, d in zip(grid, digits))
+
+
+# the total of a layout's times, None if it failed any puzzle
+def __total(times: List[Optional[float]]) -> Optional[float]:
+    return None if None in times else sum(times)
+
+
+def __time(t: Optional[float]) -> str:
+    return "failed" if t is None else f"{t:.6f}"
@@ -0,0 +1,128 @@
+import json
+import os
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Opt-in memory profiling of the phases of a benchmark run, enabled with
+# satmark -M. Each phase is wrapped in `with phase(name):`, which records:
+#
+# - "tracedPeak": the most memory allocated by Python at once during the
+#   phase, from tracemalloc, in bytes.
+# - "top": the TOP_SITES source lines that allocated the most during the
+#   phase (still allocated at the end of it), in bytes and blocks.
+# - "rss": the resident set size at the end of the phase, and "rssPeak",
+#   the peak RSS of the process so far, both in KiB.
+# - "childRssPeak": the peak RSS of the solver processes the phase ran, in
+#   KiB. The OS only keeps the largest peak of every child the process has
+#   ever waited for, so this is only known when a child of this phase set a
+#   new record. Otherwise it is null: the phase's children peaked no higher
+#   than the children of earlier phases.
+#
+# Repeated phases (e.g. one "solve" per encoding) are combined: the peaks
+# are the largest seen, and sites are kept at their largest size. Every
+# process (each pool worker) writes its own [pid].json to the directory
+# given to enable, rewritten after every phase, so the profile survives a
+# worker being killed. Phases shouldn't be nested, since each one resets
+# tracemalloc's peak.
+
+TOP_SITES = 10
+# stack frames kept for each allocation, only the innermost is reported
+FRAMES = 1
+
+__DIR: Optional[str] = None
+__PROFILE: Dict[str, dict] = {}
+# the process __PROFILE belongs to, forked workers start their own
+__PID = os.getpid()
+
+
+# turn on profiling, writing profiles to directory. Workers forked after
+# this inherit it, and start tracing when they enter their first phase.
+def enable(directory: str) -> None:
+    global __DIR
+    os.makedirs(directory, exist_ok=True)
+    __DIR = directory
+
+
+def enabled() -> bool:
+    return __DIR is not None
+
+
+@contextmanager
+def phase(name: str):
+    global __PID
+    if __DIR is None:
+        yield
+        return
+    if __PID != os.getpid():
+        __PROFILE.clear()
+        __PID = os.getpid()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(FRAMES)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    child_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        diffs = after.compare_to(before, "lineno")[:TOP_SITES]
+        __record(name, peak, child_peak, diffs)
+
+
+# child_peak is the children's peak RSS before the phase started
+def __record(name: str, peak: int, child_peak: int, diffs: list) -> None:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    entry = __PROFILE.setdefault(
+        name, {"calls": 0, "tracedPeak": 0, "childRssPeak": None, "top": {}}
+    )
+    entry["calls"] += 1
+    entry["tracedPeak"] = max(entry["tracedPeak"], peak)
+    entry["rss"] = __current_rss()
+    entry["rssPeak"] = usage.ru_maxrss
+    if children.ru_maxrss > child_peak:
+        entry["childRssPeak"] = max(entry["childRssPeak"] or 0, children.ru_maxrss)
+    for diff in diffs:
+        if diff.size_diff <= 0:
+            continue
+        frame = diff.traceback[0]
+        site = f"{frame.filename}:{frame.lineno}"
+        size, count = entry["top"].get(site, (0, 0))
+        if diff.size_diff > size:
+            entry["top"][site] = (diff.size_diff, diff.count_diff)
+    __write()
+
+
+def __write() -> None:
+    profile = {
+        "pid": os.getpid(),
+        "phases": {
+            name: {
+                **{k: v for k, v in entry.items() if k != "top"},
+                "top": [
+                    {"site": site, "size": size, "count": count}
+                    for site, (size, count) in sorted(
+                        entry["top"].items(), key=lambda x: -x[1][0]
+                    )[:TOP_SITES]
+                ],
+            }
+            for name, entry in __PROFILE.items()
+        },
+    }
+    path = os.path.join(__DIR, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+# resident set size in KiB, from /proc where there is one
+def __current_rss() -> int:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return 0
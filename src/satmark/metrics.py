@@ -0,0 +1,138 @@
+import json
+import os
+import queue
+import time
+from typing import Dict, Tuple
+
+
+# Sends progress events from the tester processes back to the main process.
+# The queue has to come from a multiprocessing Manager, so the reporter can
+# be pickled along with the Tester it is attached to.
+class Reporter:
+    def __init__(self, events) -> None:
+        self.events = events
+
+    def start(self) -> None:
+        self.events.put(("start", os.getpid(), None, None))
+
+    def puzzle(self, label: str, row: tuple) -> None:
+        # the last column of a result row is the CPU time
+        self.events.put(("puzzle", os.getpid(), label, float(row[-1])))
+
+    def done(self) -> None:
+        self.events.put(("done", os.getpid(), None, None))
+
+
+# Collects the events sent by Reporters and periodically writes a snapshot
+# of the run's progress. Snapshots are appended as JSON lines to the "file"
+# set in the "metrics" section of the config, and written to the "prometheus"
+# file in the Prometheus text format, for the node exporter's textfile
+# collector. Either can be left out. "interval" is the number of seconds
+# between snapshots, and defaults to 10.
+class Metrics:
+    def __init__(self, total: int, workers: int, config: dict) -> None:
+        self.total = total
+        self.workers = workers
+        self.json_file = config.get("file")
+        self.prom_file = config.get("prometheus")
+        self.interval = config.get("interval", 10)
+        self.completed = 0
+        self.start = time.monotonic()
+        self.__last = self.start
+        self.__busy: Dict[int, int] = {}
+        # running sum and count of CPU times for each encoding
+        self.__times: Dict[str, Tuple[float, int]] = {}
+
+    # read events from the queue for up to timeout seconds,
+    # or until the queue is empty after that.
+    def drain(self, events, timeout: float = 0.5) -> None:
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                wait = max(deadline - time.monotonic(), 0)
+                self.update(*events.get(timeout=wait))
+        except queue.Empty:
+            pass
+
+    def update(self, event: str, pid: int, label, cpu_time) -> None:
+        if event == "start":
+            self.__busy[pid] = self.__busy.get(pid, 0) + 1
+        elif event == "done":
+            self.__busy[pid] = self.__busy.get(pid, 1) - 1
+        elif event == "puzzle":
+            self.completed += 1
+            total, count = self.__times.get(label, (0.0, 0))
+            self.__times[label] = (total + cpu_time, count + 1)
+
+    # returns a snapshot if interval seconds have passed since the last one
+    def tick(self):
+        now = time.monotonic()
+        if now - self.__last < self.interval:
+            return None
+        self.__last = now
+        return self.emit()
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.start
+        rate = self.completed / elapsed if elapsed else 0.0
+        remaining = self.total - self.completed
+        busy = sum(1 for n in self.__busy.values() if n > 0)
+        return {
+            "time": time.time(),
+            "elapsed": round(elapsed, 3),
+            "completed": self.completed,
+            "total": self.total,
+            "rate": round(rate, 3),
+            "eta": round(remaining / rate, 3) if rate else None,
+            "busyWorkers": busy,
+            "workers": self.workers,
+            "utilisation": round(busy / self.workers, 3) if self.workers else 0.0,
+            "meanTimes": {
+                label: round(total / count, 6)
+                for label, (total, count) in self.__times.items()
+            },
+        }
+
+    # write a snapshot to the configured outputs, and return it
+    def emit(self) -> dict:
+        snap = self.snapshot()
+        if self.json_file:
+            with open(self.json_file, "a") as f:
+                f.write(json.dumps(snap) + "\n")
+        if self.prom_file:
+            # write to a temporary file and rename it, so the exporter
+            # never reads a half-written file
+            tmp = f"{self.prom_file}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(self.__prometheus(snap))
+            os.replace(tmp, self.prom_file)
+        return snap
+
+    def __prometheus(self, snap: dict) -> str:
+        metrics = [
+            ("puzzles_completed", "counter", "Puzzles solved", snap["completed"]),
+            ("puzzles_total", "gauge", "Puzzles in the run", snap["total"]),
+            ("puzzles_per_second", "gauge", "Puzzles per second", snap["rate"]),
+            ("eta_seconds", "gauge", "Estimated seconds left", snap["eta"] or 0),
+            ("worker_utilisation", "gauge", "Busy workers", snap["utilisation"]),
+        ]
+        out = ""
+        for name, kind, help, value in metrics:
+            out += f"# HELP satmark_{name} {help}\n"
+            out += f"# TYPE satmark_{name} {kind}\n"
+            out += f"satmark_{name} {value}\n"
+        out += "# HELP satmark_mean_cpu_seconds Mean CPU time per puzzle\n"
+        out += "# TYPE satmark_mean_cpu_seconds gauge\n"
+        for label, mean in snap["meanTimes"].items():
+            out += f'satmark_mean_cpu_seconds{{encoding="{label}"}} {mean}\n'
+        return out
+
+
+# one line summary of a snapshot, for printing to stdout
+def progress_line(snap: dict) -> str:
+    eta = f"{snap['eta']:.0f}s" if snap["eta"] is not None else "unknown"
+    return (
+        f"{snap['completed']}/{snap['total']} puzzles, "
+        f"{snap['rate']:.2f} puzzles/sec, ETA {eta}, "
+        f"{snap['busyWorkers']}/{snap['workers']} workers busy"
+    )
@@ -0,0 +1,58 @@
+import time
+
+from satcoder import Encoding
+from satcoder.cnf import cells
+from satcoder.solver import Solver
+
+from .satsolver import SatSolver
+
+
+# Runs puzzles through the native solver in satcoder instead of minisat,
+# as a baseline for how much the CNF/SAT round trip costs. It reports the
+# same columns as SatSolver, so it slots into the result tables as another
+# encoding. The encoding is ignored, since no CNF is involved.
+class NativeSolver(SatSolver):
+    EXT = "sud"
+
+    def name(self, enc: Encoding) -> str:
+        return "native"
+
+    # puzzle is a list of 81 cell values, written in the one-line format
+    def write_input(self, out, puzzle: list, enc: Encoding, cache=None) -> None:
+        out.write("".join(map(str, puzzle)).encode())
+
+    def _solve_puzzle(self, i):
+        filename = f"{self._in_dir}/sudoku_{str(i + 1).zfill(2)}.{self.EXT}"
+        outfile = f"{self._work_dir}/sudoku_{str(i + 1).zfill(2)}.out"
+        with open(filename, "r") as f:
+            grid = cells(f.read())
+
+        solver = Solver()
+        start = time.process_time()
+        solution = solver.solve(grid)
+        elapsed = time.process_time() - start
+
+        # write the solution the same way minisat does,
+        # so decode_solutions can still be used on it.
+        with open(outfile, "w") as out:
+            out.write(self.__assignment(solution))
+
+        def rate(x: int) -> str:
+            return str(round(x / elapsed)) if elapsed else "0"
+
+        return (
+            str(solver.decisions),
+            rate(solver.decisions),
+            str(solver.propagations),
+            rate(solver.propagations),
+            f"{elapsed:.6f}",
+        )
+
+    def __assignment(self, solution) -> str:
+        if solution is None:
+            return "UNSAT\n"
+        literals = (
+            str(var) if solution[(var - 1) // 9] == (var - 1) % 9 + 1 else str(-var)
+            for var in range(1, 730)
+        )
+        return "SAT\n" + " ".join(literals) + " 0\n"
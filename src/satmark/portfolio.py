@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from mdtable import TableMaker
+from satcoder import Encoding, encode_to
+from satcoder.puzzles import load
+
+from .solvers import SolverDef, member_name, registry
+
+# Portfolio solving. The same puzzle is encoded with several encodings and
+# handed to several solvers at once, and whichever member of the portfolio
+# answers first (SAT or UNSAT) wins, the rest are killed. This trades CPU
+# for latency, since which member is fastest varies from puzzle to puzzle.
+# The members are every encoding with every installed solver, unless the
+# config has a "portfolio" list of member names, e.g. ["minimal",
+# "extended-cadical"], using the same names as the result files.
+
+@dataclass
+class Member:
+    name: str
+    enc: Encoding
+    solver: SolverDef
+
+
+# the members of the portfolio, from the config
+def members(config: dict) -> List[Member]:
+    solvers = [s for s in registry(config).values() if s.available()]
+    portfolio = [
+        Member(member_name(enc, s.name, config), enc, s)
+        for s in solvers
+        for enc in Encoding
+    ]
+    if "portfolio" in config:
+        portfolio = [m for m in portfolio if m.name in config["portfolio"]]
+    return portfolio
+
+
+# race every member on a puzzle (a list of 81 cell values), using work_dir
+# for their CNF and output files. returns the winning member (None if no
+# member found an answer), its result, SAT or UNSAT, and the wall time taken.
+# The winner's assignment is left in work_dir/[name].out, in minisat's format.
+def race(
+    grid: list, portfolio: List[Member], work_dir: str
+) -> Tuple[Optional[Member], str, float]:
+    os.makedirs(work_dir, exist_ok=True)
+    # write every CNF before starting any solver, so they all start together
+    files = []
+    for m in portfolio:
+        infile, outfile = f"{work_dir}/{m.name}.cnf", f"{work_dir}/{m.name}.out"
+        with open(infile, "wb") as f:
+            encode_to(f, grid, m.enc)
+        files.append((infile, outfile, f"{work_dir}/{m.name}.log"))
+
+    start = time.perf_counter()
+    procs = []
+    for m, (infile, outfile, log) in zip(portfolio, files):
+        with open(log, "w") as stdout:
+            args = m.solver.args(infile, outfile)
+            procs.append(subprocess.Popen(args, stdout=stdout))
+
+    winner, result = None, ""
+    # a thread blocks on each member, rather than polling them, so waiting
+    # costs no CPU that the members could use
+    with ThreadPoolExecutor(len(procs)) as waiters:
+        futures = {waiters.submit(proc.wait): i for i, proc in enumerate(procs)}
+        running = set(futures)
+        while running and winner is None:
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = futures[future]
+                _, outfile, log = files[i]
+                with open(log, "r") as f:
+                    result = portfolio[i].solver.collect(outfile, f.read())
+                if result:
+                    winner = portfolio[i]
+                    break
+        elapsed = time.perf_counter() - start
+
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+    for proc in procs:
+        proc.wait()
+    return winner, result, elapsed
+
+
+# race the portfolio on every puzzle in each of the puzzle sets in tests,
+# writing a [set]-portfolio.md table of winners and times, the same results
+# as [set]-portfolio.json, and portfolio.md with the win rates of each member.
+def run_portfolio(config, tests: List[str], silent: bool) -> None:
+    portfolio = members(config)
+    if not portfolio:
+        print("Error: no portfolio members with an installed solver")
+        exit(1)
+
+    out = config["resultsDir"]
+    wins: Dict[str, Dict[str, int]] = {}
+    for test in tests:
+        path, count, offset, size = config.puzzle_values(test)
+        grids = load(path, size, offset, count).tolist()
+        sat_dir = f"{config['cacheDir']}sat/{test.lower()}/"
+        os.makedirs(sat_dir, exist_ok=True)
+
+        rows, results = [], []
+        wins[test] = {m.name: 0 for m in portfolio}
+        for i, grid in enumerate(grids):
+            num = str(i + 1).zfill(2)
+            work_dir = f"{config['cacheDir']}portfolio/{test.lower()}/{num}"
+            winner, result, elapsed = race(grid, portfolio, work_dir)
+            name = winner.name if winner else "None"
+            if winner:
+                wins[test][winner.name] += 1
+                # keep the winner's solution where decode_solutions looks
+                solution = f"{work_dir}/{winner.name}.out"
+                shutil.copy(solution, f"{sat_dir}sudoku_{num}.out")
+            rows.append((f"Test {num}", name.capitalize(), result, f"{elapsed:.6f}"))
+            results.append({"puzzle": i + 1, "time": elapsed, "winner": name})
+
+        maker = TableMaker(new_line=False)
+        cols = ("Puzzle", "Winner", "Result", "Wall Time (sec)")
+        table = maker.table(f"{test} Portfolio", [cols] + rows)
+        None if silent else print(table)
+        with open(f"{out}{test.lower()}-portfolio.md", "w") as f:
+            f.write(table)
+        with open(f"{out}{test.lower()}-portfolio.json", "w") as f:
+            json.dump({"set": test, "encoding": "Portfolio", "puzzles": results}, f)
+
+    write_win_rates(wins, f"{out}portfolio.md")
+    None if silent else print(f"Win rates saved to {out}portfolio.md")
+
+
+def write_win_rates(wins: Dict[str, Dict[str, int]], out_file: str) -> None:
+    maker = TableMaker(new_line=True)
+    cols = ("Member", "Wins", "Win Rate")
+    with open(out_file, "w") as f:
+        for test, counts in wins.items():
+            total = sum(counts.values())
+            rows = [
+                (name.capitalize(), n, f"{n / total:.2%}" if total else "0.00%")
+                for name, n in sorted(counts.items(), key=lambda x: -x[1])
+            ]
+            f.write(maker.table(f"{test} Portfolio Win Rates", [cols] + rows))
@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import time
+
+from satcoder.generator import generate_many
+
+CONFIG_FILE = f"{os.getcwd()}/sat_config.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate puzzles with unique solutions and add them to satmark"
+    )
+    args = setup_args(parser)
+
+    # read the config as plain json, Config rewrites the puzzle file paths
+    # so it can't be written back out.
+    if not os.path.isfile(CONFIG_FILE):
+        print(f"Error: Config file {CONFIG_FILE} not found")
+        exit(1)
+    with open(CONFIG_FILE, "r") as f:
+        config = json.load(f)
+
+    file = args.file or f"{args.name.lower()}.txt"
+    path = f"{config['puzzleDir']}{file}"
+    os.makedirs(config["puzzleDir"], exist_ok=True)
+
+    write_puzzles(path, args)
+
+    if not args.no_register:
+        config["puzzleSets"][args.name] = {
+            "file": file,
+            "numPuzzles": args.num,
+            "size": 1,
+            "offset": 0,
+        }
+        with open(CONFIG_FILE, "w") as f:
+            json.dump(config, f, indent=4)
+        print_if_not(args.silent, f"Registered puzzle set {args.name}")
+
+
+def setup_args(parser: argparse.ArgumentParser) -> argparse.Namespace:
+    parser.add_argument("name", type=str, help="name of the puzzle set")
+    parser.add_argument(
+        "-n", "--num", type=int, default=100, help="number of puzzles to generate"
+    )
+    parser.add_argument(
+        "-c", "--clues", type=int, default=25, help="number of clues in each puzzle"
+    )
+    parser.add_argument(
+        "-d",
+        "--difficulty",
+        type=int,
+        default=0,
+        help="minimum decisions the native solver needs for each puzzle",
+    )
+    parser.add_argument(
+        "-r", "--seed", type=int, default=0, help="seed for the generator"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of processes to use, defaults to all cores",
+    )
+    parser.add_argument(
+        "-f",
+        "--file",
+        type=str,
+        default="",
+        help="file to write to, relative to puzzleDir (defaults to [name].txt)",
+    )
+    parser.add_argument(
+        "-N",
+        "--no-register",
+        action="store_true",
+        help="don't add the puzzle set to sat_config.json",
+    )
+    parser.add_argument("-s", "--silent", action="store_true")
+    return parser.parse_args()
+
+
+# puzzles are written as they come out of the generator,
+# so memory use doesn't grow with the number of puzzles.
+def write_puzzles(path: str, args: argparse.Namespace) -> None:
+    start = time.perf_counter()
+    puzzles = generate_many(
+        args.num, args.seed, args.clues, args.difficulty, args.jobs
+    )
+    with open(path, "w") as f:
+        for i, puzzle in enumerate(puzzles):
+            f.write(puzzle + "\n")
+            if (i + 1) % 10000 == 0:
+                print_if_not(args.silent, f"{i + 1}/{args.num} puzzles generated")
+
+    elapsed = time.perf_counter() - start
+    print_if_not(
+        args.silent,
+        f"Wrote {args.num} puzzles to {path} in {elapsed:.2f}s "
+        f"({args.num / elapsed:.0f} puzzles/sec)",
+    )
+
+
+def print_if_not(b: bool, str: str) -> None:
+    None if b else print(str)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,30 @@
 import os
-import re
-import subprocess
 from typing import List, Tuple
 
-from satcoder import Encoding
+from satcoder import Encoding, encode_to
 
-from .conf import Config
+from .conf import load_config
+from .memprof import phase
+from .solvers import default_solver, member_name, registry
 
 TestResult = Tuple[str, str, str, str, str, str]
 Averages = Tuple[str, str, str, str, str]
 
-CONFIG_FILE = f"{os.getcwd()}/sat_config.json"
-
 
 class SatSolver:
     __DECISIONS, __DEC_RATE, __PROPS, __PROP_RATE, __TIME = range(5)
-
-    def __init__(self, pc: int, test: str, enc=Encoding.MINIMAL) -> None:
-        self.config = Config(CONFIG_FILE)
+    # extension of the puzzle files the tester should write for this solver
+    EXT = "cnf"
+
+    # solver is the name of the external solver to run, from the solvers
+    # defined in the config. Defaults to the config's default solver.
+    def __init__(self, pc: int, test: str, enc=Encoding.MINIMAL, solver=None) -> None:
+        self.config = load_config()
+        self.solver = solver or default_solver(self.config)
+        self.__def = registry(self.config).get(self.solver)
         self.__puzzle_count: int = pc
-        self.__in_dir: str = (
-            f"{self.config['cacheDir']}{enc.name.lower()}/{test.lower()}"
-        )
-        self.__work_dir: str = f"{self.config['cacheDir']}sat/{test.lower()}/"
+        self._in_dir: str = f"{self.config['cacheDir']}{self.name(enc)}/{test.lower()}"
+        self._work_dir: str = f"{self.config['cacheDir']}sat/{test.lower()}/"
         self.__table_rows: list = []
         self.params = {
             self.__DECISIONS: [],
@@ -36,22 +38,45 @@ class SatSolver:
     # Update the testing environment with new parameters
     def update_parameters(self, test=None, enc=None, pc=None):
         if test:
-            self.__work_dir = f"{self.config['cacheDir']}sat/{test.lower()}/"
+            self._work_dir = f"{self.config['cacheDir']}sat/{test.lower()}/"
         if enc:
-            test = test or self.__work_dir.split("/")[-2]
-            self.__in_dir = (
-                f"{self.config['cacheDir']}{enc.name.lower()}/{test.lower()}"
-            )
+            test = test or self._work_dir.split("/")[-2]
+            self._in_dir = f"{self.config['cacheDir']}{self.name(enc)}/{test.lower()}"
         if pc:
             self.__puzzle_count = pc
 
-    def solve(self):
+    # name of the solver for a given encoding, used for directory names,
+    # and capitalized, as the label in the result tables.
+    def name(self, enc: Encoding) -> str:
+        return member_name(enc, self.solver, self.config)
+
+    # write a puzzle read from a puzzle set (a list of 81 cell values)
+    # to out (a binary file), converted into the input this solver reads
+    def write_input(self, out, puzzle: list, enc: Encoding, cache=None) -> None:
+        encode_to(out, puzzle, enc, cache)
+
+    # on_result, if given, is called with each puzzle's index and row as it
+    # is solved. done holds the rows of puzzles solved by an earlier run
+    # (see journal.Journal), by index, which are used instead of solving
+    # them again.
+    def solve(self, on_result=None, done=None):
+        with phase("solve"):
+            return self.__solve(on_result, done)
+
+    def __solve(self, on_result, done):
         self.__clear()
-        # iterate through CNF output and call minisat on each
-        os.system(f"mkdir -p {self.__work_dir}")
+        done = done or {}
+        # iterate through CNF output and call the solver on each
+        os.system(f"mkdir -p {self._work_dir}")
 
         for i in range(self.__puzzle_count):
-            self.__solve_puzzle(i)
+            if i in done:
+                self.__record(done[i])
+                continue
+            row = self._solve_puzzle(i)
+            self.__record(row)
+            if on_result:
+                on_result(i, row)
 
         self.__compute_min_max()
         self.__compute_averages()
@@ -63,47 +88,17 @@ class SatSolver:
             self.params[key] = []
         self.min_vals, self.max_vals, self.averages = [], [], []
 
-    def __get_data(self, data):
-        decision, _, decision_rate = re.findall(r"[-+]?\d*\.\d+|\d+", data[0])[:3]
-        self.params[self.__DECISIONS].append(decision)
-        self.params[self.__DEC_RATE].append(decision_rate)
-
-        props_data = tuple(re.findall(r"[-+]?\d*\.\d+|\d+", data[1])[:2])
-        prop, p_rate = props_data
-        self.params[self.__PROPS].append(prop)
-        self.params[self.__PROP_RATE].append(p_rate)
-
-        cpu = data[2].split(":")
-        time = cpu[1].strip()
-        time = time.replace(" s", "")
-        self.params[self.__TIME].append(time)
-
-        return (
-            decision.strip(),
-            decision_rate.strip(),
-            prop.strip(),
-            p_rate,
-            time.strip(),
-        )
-
-    def __solve_puzzle(self, i):
-        filename = f"{self.__in_dir}/sudoku_{str(i + 1).zfill(2)}.cnf"
-        outfile = f"{self.__work_dir}/sudoku_{str(i + 1).zfill(2)}.out"
-        minisat = f"minisat {filename} {outfile}"
-
-        # get output from minisat
-        output = subprocess.Popen(
-            minisat, shell=True, stdout=subprocess.PIPE
-        ).communicate()[0]
-
-        output = output.decode("utf-8").split("\n")
-
-        def want_line(l):
-            return "CPU time" in l or "propagations" in l or "decisions" in l
-
-        data = tuple(line for line in output if want_line(line))
-
-        self.__table_rows.append(self.__get_data(data))
+    # add a row of results for a single puzzle to the tables
+    def __record(self, row) -> None:
+        for key, value in zip(self.params, row):
+            self.params[key].append(value)
+        self.__table_rows.append(row)
+
+    # solve a single puzzle, returns its row in the results table
+    def _solve_puzzle(self, i):
+        filename = f"{self._in_dir}/sudoku_{str(i + 1).zfill(2)}.{self.EXT}"
+        outfile = f"{self._work_dir}/sudoku_{str(i + 1).zfill(2)}.out"
+        return self.__def.run(filename, outfile)
 
     def __compute_averages(self):
         def av(x: List[str], r: int) -> str:
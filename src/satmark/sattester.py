@@ -1,13 +1,18 @@
+import json
 import os
 from dataclasses import dataclass
 from typing import Tuple
 
 from mdtable import TableMaker
-from satcoder import Encoding, encode
+from satcoder import Encoding
+from satcoder.features import features
+from satcoder.puzzles import load
 from copy import copy
 
-from .conf import Config
+from .conf import load_config
+from .memprof import phase
 from .satsolver import SatSolver
+from .timing import check as check_timing
 
 Averages = Tuple[str, str, str, str, str]
 Min = Tuple[str, str, str, str, str, str]
@@ -15,9 +20,6 @@ Max = Tuple[str, str, str, str, str, str]
 TestResult = Tuple[Averages, Min, Max]
 
 
-CONFIG = Config(f"{os.getcwd()}/sat_config.json")
-
-
 @dataclass
 class TestData:
     silent: bool
@@ -32,8 +34,9 @@ class TestData:
 class Tester:
     def __init__(self, test_info=None, solver=None, silent=False):
         if test_info is None:
-            default_set = CONFIG["defaultPuzzleSet"]
-            default = CONFIG["puzzleSets"][default_set]
+            config = load_config()
+            default_set = config["defaultPuzzleSet"]
+            default = config["puzzleSets"][default_set]
             test_info = TestData(
                 silent,
                 test_type=default_set,
@@ -49,18 +52,42 @@ class Tester:
             )
         self.__p: TestData = test_info
         self.solver: SatSolver = solver
+        # set to a metrics.Reporter to report progress while testing
+        self.reporter = None
+        # set to a journal.Journal to record results as they are solved,
+        # and skip the puzzles it already has results for
+        self.journal = None
+        # features of each puzzle in the set, saved with the results
+        self.__features = []
+        # the machine and calibration of the last test, see timing.py
+        self.__timing = None
         self.__update_working_dir(test_info.enc, test_info.test_type)
 
     def test_name(self):
         return self.__p.test_type
 
+    def puzzle_count(self):
+        return self.__p.num_puzzles
+
     def update_params(self, test_info: TestData):
         self.__p = test_info
+        self.__features = []
         self.solver.update_parameters(
             test=test_info.test_type, enc=test_info.enc, pc=test_info.num_puzzles
         )
         self.__update_working_dir(test_info.enc, test_info.test_type)
 
+    # swap the solver used for the tests, e.g. SatSolver for NativeSolver.
+    # solver is the name of the external solver SatSolver should run.
+    def update_solver(self, solver_type: type, solver=None):
+        self.solver = solver_type(
+            pc=self.__p.num_puzzles,
+            test=self.__p.test_type,
+            enc=self.__p.enc,
+            solver=solver,
+        )
+        self.__update_working_dir(self.__p.enc, self.__p.test_type)
+
     def update_encoding(self, enc: Encoding):
         self.__p.enc = enc
         self.solver.update_parameters(enc=enc)
@@ -71,38 +98,66 @@ class Tester:
         mkdir = f"mkdir -p {working_dir}"
         os.system(mkdir)
 
-        self.__encode_puzzles(working_dir)
-
-        table_rows = self.solver.solve()
+        if self.reporter:
+            self.reporter.start()
+
+        test, name = self.__p.test_type, self.__name()
+        done = self.journal.completed(test, name) if self.journal else {}
+        # nothing to encode if every puzzle is already in the journal,
+        # e.g. when writing the reports of a sharded run
+        self.__encode_puzzles(working_dir, len(done) < self.__p.num_puzzles)
+
+        def on_result(i, row):
+            if self.journal:
+                self.journal.record(test, name, i, row)
+            if self.reporter:
+                self.reporter.puzzle(name, row)
+
+        self.__timing = check_timing()
+        table_rows = self.solver.solve(on_result, done)
+        if self.journal:
+            self.journal.sync()
+        if self.reporter:
+            self.reporter.done()
         self.__output_results(table_rows, out_dir)
         averages = table_rows[-1]
         maxes = table_rows[-2]
         mins = table_rows[-3]
-        name = self.__p.enc.name.capitalize()
-        return ((self.__p.enc.name.capitalize(),) + averages, (name,) + maxes, (name,) + mins)
+        name = self.__name()
+        return ((name,) + averages, (name,) + maxes, (name,) + mins)
+
+    def __name(self) -> str:
+        return self.solver.name(self.__p.enc).capitalize()
 
     def __update_working_dir(self, enc: Encoding, test: str):
-        self.__working_dir = f"{CONFIG['cacheDir']}{enc.name.lower()}/{test.lower()}"
+        name = self.solver.name(enc)
+        self.__working_dir = f"{load_config()['cacheDir']}{name}/{test.lower()}"
 
-    def __encode_puzzles(self, working_dir):
+    def __encode_puzzles(self, working_dir, write=True):
         enc = self.__p.enc
-        with open(self.__p.puzzles_dir, "r") as f:
-            for i in range(self.__p.num_puzzles):
-                for _ in range(self.__p.offset):
-                    f.readline()
-                puzzle = "".join(f.readline() for _ in range(self.__p.size))
-                # set write to true, so fixed cnf is cached
-                test = self.__p.test_type
-                # put fixed cnf in directory name with the test name, this way
-                # if the program is mutltiproccessed, each process
-                # generates its own cache file and there won't be
-                # race conditions where one process reads an unfinished
-                # cache file.
-                cnf = encode(puzzle, enc, f"{CONFIG['cacheDir']}fixed_cnf/{test}/")
-
-                out_file = f"{working_dir}/sudoku_{str(i+1).zfill(2)}.cnf"
-                with open(out_file, "w") as out:
-                    out.write(cnf)
+        with phase("parse"):
+            # parse the whole puzzle file at once, rather than one at a time
+            p = self.__p
+            grids = load(p.puzzles_dir, p.size, p.offset, p.num_puzzles).tolist()
+            # the puzzles are the same for every encoding, so only do this once
+            if not self.__features:
+                self.__features = [features(grid) for grid in grids]
+        if not write:
+            return
+        test = self.__p.test_type
+        # put fixed cnf in directory name with the test name, this way
+        # if the program is mutltiproccessed, each process
+        # generates its own cache file and there won't be
+        # race conditions where one process reads an unfinished
+        # cache file.
+        cache = f"{load_config()['cacheDir']}fixed_cnf/{test}/"
+        with phase("write_cnf"):
+            for i, grid in enumerate(grids):
+                out_file = f"{working_dir}/sudoku_{str(i+1).zfill(2)}.{self.solver.EXT}"
+                # the encoding is streamed straight to the file, so it is
+                # never held in memory all at once.
+                with open(out_file, "wb") as out:
+                    self.solver.write_input(out, grid, enc, cache)
 
     def __output_results(self, table_rows, out_dir):
         # add a header to the table, the number of puzzles
@@ -128,12 +183,13 @@ class Tester:
                 "CPU Time (sec)",
             )
             title = (
-                f"{self.__p.test_type} Test ({self.__p.enc.name.capitalize()} Encoding)"
+                f"{self.__p.test_type} Test ({self.__name()} Encoding)"
             )
 
             maker = TableMaker(sep_every=1, new_line=False, sep_func=header_func)
 
-            table = maker.table(title, table_rows, cols)
+            with phase("report"):
+                table = maker.table(title, table_rows, cols)
 
             self.__print(table)
 
@@ -146,6 +202,34 @@ class Tester:
 
                 with open(out_dir, "w") as outfile:
                     outfile.write(table)
+                    noisy = self.__timing["noisy"] if self.__timing else []
+                    if noisy:
+                        outfile.write(f"\n\n**Noisy run:** {'; '.join(noisy)}\n")
+
+                self.__output_json(table_rows, os.path.splitext(out_dir)[0] + ".json")
+
+    # save the per-puzzle results in a machine readable format alongside the
+    # markdown table, so runs can be compared later with satmark --compare.
+    def __output_json(self, table_rows, out_file):
+        keys = ("decisions", "decisionRate", "propagations", "propagationRate", "time")
+        results = {
+            "set": self.__p.test_type,
+            "encoding": self.__name(),
+            "puzzles": [
+                {
+                    "puzzle": i + 1,
+                    **{k: float(v) for k, v in zip(keys, row)},
+                    "features": feats,
+                }
+                for i, (row, feats) in enumerate(
+                    zip(table_rows[: self.__p.num_puzzles], self.__features)
+                )
+            ],
+        }
+        if self.__timing:
+            results["timing"] = self.__timing
+        with open(out_file, "w") as outfile:
+            json.dump(results, outfile)
 
     def __print(self, str):
         None if self.__p.silent else print(str)
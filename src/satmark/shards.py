@@ -0,0 +1,313 @@
+import glob
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from satcoder import Encoding
+from satcoder.puzzles import load
+
+from .journal import Journal
+from .nativesolver import NativeSolver
+from .satsolver import SatSolver
+from .solvers import member_name, registry
+
+# Runs a benchmark across several machines through a shared directory (e.g.
+# on NFS), instead of on the cores of one machine. The directory is a work
+# queue of shards, each a range of puzzles from one puzzle set, to be solved
+# by one member (an encoding and solver, or the native solver):
+#
+#   [queue]/run.json     the puzzle sets and members of the run
+#   [queue]/tasks/       shards waiting to be claimed
+#   [queue]/leases/      shards claimed by a worker
+#   [queue]/results/     the result rows of finished shards
+#
+# satmark --shard writes the shards. Workers, started with satmark --work
+# from the same benchmark directory on any machine, claim a shard by
+# renaming it from tasks/ to leases/, which only one of them can do. While
+# solving it, the worker touches its lease every lease / 3 seconds, and a
+# lease that hasn't been touched for lease seconds (satmark --lease, 300 by
+# default) is taken to belong to a worker that died, and is moved back to
+# tasks/ for another to claim.
+#
+# A worker never changes a lease where other workers can see it. It first
+# renames the lease to a name of its own ([shard].[worker]), which only one
+# worker can do, then checks it again there, and renames it back if it
+# turns out not to be its to change. A claimed lease holds its worker's
+# name under "owner", written before the lease is renamed into place, so a
+# worker whose lease expired while it was still solving can tell that the
+# shard has been claimed again, and leave the new lease alone.
+# Finished shards are written to results/ (atomically, with os.replace), and
+# satmark --merge turns them into the journal of a run (see journal.py),
+# which is then resumed to write the usual reports without solving anything.
+
+# seconds a worker waits before checking for expired leases again, when
+# every shard left is leased by another worker
+IDLE_WAIT = 5.0
+
+
+# the members test_all runs every puzzle set with: every encoding with every
+# installed solver, and the native solver. The label is the name of the
+# member in the reports.
+def members(config) -> List[dict]:
+    solvers = [name for name, s in registry(config).items() if s.available()]
+    sat = [
+        {
+            "encoding": enc.name.lower(),
+            "solver": solver,
+            "label": member_name(enc, solver, config).capitalize(),
+        }
+        for solver in solvers
+        for enc in Encoding
+    ]
+    return sat + [{"encoding": "native", "solver": "", "label": "Native"}]
+
+
+# write the shards for every puzzle set and member to queue_dir
+def create_shards(config, queue_dir: str, members: List[dict], size: int) -> int:
+    for sub in ("tasks", "leases", "results"):
+        os.makedirs(os.path.join(queue_dir, sub), exist_ok=True)
+    sets = {}
+    shards = 0
+    for test in config["puzzleSets"]:
+        _, count, _, _ = config.puzzle_values(test)
+        sets[test] = count
+        for member in members:
+            for start in range(0, count, size):
+                task = {
+                    "set": test,
+                    "start": start,
+                    "end": min(start + size, count),
+                    **member,
+                }
+                name = f"{test.lower()}-{member['label'].lower()}-{start:09d}.json"
+                __write_json(os.path.join(queue_dir, "tasks", name), task)
+                shards += 1
+    run = {"sets": sets, "members": members}
+    __write_json(os.path.join(queue_dir, "run.json"), run)
+    return shards
+
+
+# claim and solve shards until there are none left, returns how many this
+# worker solved
+def run_worker(config, queue_dir: str, lease: float, silent: bool) -> int:
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    solved = 0
+    while True:
+        name = claim(queue_dir, lease, worker)
+        if name is None:
+            # including the leases other workers have moved aside
+            if not os.listdir(os.path.join(queue_dir, "leases")):
+                return solved
+            # the rest are being solved, unless their worker died
+            time.sleep(IDLE_WAIT)
+            continue
+        lease_file = os.path.join(queue_dir, "leases", name)
+        try:
+            with open(lease_file, "r") as f:
+                task = json.load(f)
+        except FileNotFoundError:
+            # expired before we read it, and reclaimed by someone else
+            continue
+        task.pop("owner", None)
+        None if silent else print(f"{worker}: solving {name}")
+        with Heartbeat(lease_file, lease / 3, worker):
+            rows = solve_shard(config, task, f"{worker}-{name}")
+        result = {**task, "worker": worker, "rows": rows}
+        __write_json(os.path.join(queue_dir, "results", name), result)
+        release(queue_dir, name, worker)
+        solved += 1
+
+
+# move a shard from tasks/ to leases/ for worker, returns its name, or None
+# if there are no shards left to claim. Expired leases are put back in
+# tasks/ first.
+def claim(queue_dir: str, lease: float, worker: str) -> Optional[str]:
+    tasks = os.path.join(queue_dir, "tasks")
+    leases = os.path.join(queue_dir, "leases")
+    now = time.time()
+    for name in os.listdir(leases):
+        try:
+            expired = now - os.stat(os.path.join(leases, name)).st_mtime > lease
+        except FileNotFoundError:
+            # finished, or another worker moved it first
+            continue
+        if expired:
+            __expire(queue_dir, name, lease, worker)
+    for name in sorted(__shards(tasks)):
+        mine = os.path.join(leases, f"{name}.{worker}")
+        try:
+            # the lease starts now, not when the shard was written. This has
+            # to happen before the rename, or another worker could see the
+            # new lease with the old time and put it back as expired.
+            os.utime(os.path.join(tasks, name))
+            os.rename(os.path.join(tasks, name), mine)
+        except FileNotFoundError:
+            # another worker claimed it first
+            continue
+        with open(mine, "r+") as f:
+            task = json.load(f)
+            f.seek(0)
+            json.dump({**task, "owner": worker}, f)
+            f.truncate()
+        os.rename(mine, os.path.join(leases, name))
+        return name
+    return None
+
+
+# the worker that claimed a lease, or None if it isn't there
+def lease_owner(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("owner")
+    except FileNotFoundError:
+        return None
+
+
+# remove worker's lease on a shard it finished. If the lease expired while
+# it was solving, and another worker claimed the shard again, it's left to
+# that worker.
+def release(queue_dir: str, name: str, worker: str) -> None:
+    path = os.path.join(queue_dir, "leases", name)
+    mine = f"{path}.{worker}"
+    try:
+        os.rename(path, mine)
+        if lease_owner(mine) == worker:
+            os.remove(mine)
+        else:
+            os.rename(mine, path)
+    except FileNotFoundError:
+        # expired and put back in tasks/, or being checked by another worker
+        pass
+
+
+# solve the puzzles of a shard, returns their result rows
+def solve_shard(config, task: dict, work_name: str) -> List[list]:
+    grids = __puzzles(config, task["set"])[task["start"] : task["end"]].tolist()
+    if task["encoding"] == "native":
+        solver: SatSolver = NativeSolver(pc=len(grids), test=work_name)
+        enc = Encoding.MINIMAL
+    else:
+        enc = Encoding[task["encoding"].upper()]
+        solver = SatSolver(
+            pc=len(grids), test=work_name, enc=enc, solver=task["solver"]
+        )
+    in_dir = f"{config['cacheDir']}{solver.name(enc)}/{work_name.lower()}"
+    os.makedirs(in_dir, exist_ok=True)
+    for i, grid in enumerate(grids):
+        with open(f"{in_dir}/sudoku_{str(i + 1).zfill(2)}.{solver.EXT}", "wb") as out:
+            solver.write_input(out, grid, enc)
+    # the last three rows are the minimums, maximums and averages
+    rows = [list(row) for row in solver.solve()[: len(grids)]]
+    shutil.rmtree(in_dir)
+    shutil.rmtree(f"{config['cacheDir']}sat/{work_name.lower()}")
+    return rows
+
+
+# the solvers the run was sharded for, from run.json, in the order
+# test_all runs them. The native solver is always part of a run.
+def run_solvers(queue_dir: str) -> List[str]:
+    with open(os.path.join(queue_dir, "run.json"), "r") as f:
+        run = json.load(f)
+    solvers = [m["solver"] for m in run["members"] if m["solver"]]
+    return list(dict.fromkeys(solvers))
+
+
+# write the rows of every finished shard to a journal, so the run can be
+# resumed to write its reports. Exits if any shards aren't finished.
+def merge_results(queue_dir: str, journal: Journal) -> int:
+    unfinished = len(__shards(os.path.join(queue_dir, "tasks")))
+    unfinished += len(os.listdir(os.path.join(queue_dir, "leases")))
+    if unfinished:
+        print(f"Error: {unfinished} shards in {queue_dir} haven't been solved yet")
+        exit(1)
+    rows = 0
+    for filename in sorted(glob.glob(os.path.join(queue_dir, "results", "*.json"))):
+        with open(filename, "r") as f:
+            shard = json.load(f)
+        for i, row in enumerate(shard["rows"]):
+            journal.record(shard["set"], shard["label"], shard["start"] + i, row)
+            rows += 1
+    journal.sync()
+    return rows
+
+
+# each worker loads a puzzle set once, and takes its shards from that
+__PUZZLES: Dict[str, memoryview] = {}
+
+
+def __puzzles(config, test: str) -> memoryview:
+    if test not in __PUZZLES:
+        path, count, offset, size = config.puzzle_values(test)
+        __PUZZLES[test] = load(path, size, offset, count)
+    return __PUZZLES[test]
+
+
+# the shards in a directory, without any files still being written
+def __shards(directory: str) -> List[str]:
+    return [name for name in os.listdir(directory) if name.endswith(".json")]
+
+
+# put an expired lease (name, in leases/) back in tasks/. It is checked
+# again once this worker has moved it aside, since between the check in
+# claim and the move, another worker could have put it back and a third
+# claimed the shard again, and then it isn't expired any more.
+def __expire(queue_dir: str, name: str, lease: float, worker: str) -> None:
+    leases = os.path.join(queue_dir, "leases")
+    # name can be a lease another worker moved aside and never moved back
+    shard = name[: name.index(".json") + len(".json")]
+    mine = os.path.join(leases, f"{shard}.{worker}")
+    try:
+        os.rename(os.path.join(leases, name), mine)
+        if time.time() - os.stat(mine).st_mtime > lease:
+            os.rename(mine, os.path.join(queue_dir, "tasks", shard))
+        else:
+            os.rename(mine, os.path.join(leases, name))
+    except FileNotFoundError:
+        # another worker moved it first
+        pass
+
+
+# write JSON so that readers never see a partly written file
+def __write_json(path: str, data: dict) -> None:
+    tmp = f"{path}.{socket.gethostname()}-{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# keeps worker's lease from expiring by touching it from a background thread
+class Heartbeat:
+    def __init__(self, path: str, interval: float, worker: str) -> None:
+        self.path = path
+        self.interval = interval
+        self.worker = worker
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.__beat, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop.set()
+        self.thread.join()
+
+    def __beat(self) -> None:
+        while not self.stop.wait(self.interval):
+            owner = lease_owner(self.path)
+            if owner is None:
+                # moved aside by another worker for a moment, or expired
+                continue
+            if owner != self.worker:
+                # it expired, and the shard was claimed again
+                return
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,163 @@
+import os
+import re
+import resource
+import shutil
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Registry of external SAT solvers satmark can benchmark. Solvers are defined
+# in the "solvers" section of the config, e.g.
+#
+#   "solvers": {
+#       "minisat": {
+#           "command": ["minisat", "{input}", "{output}"],
+#           "output": "file",
+#           "stats": "minisat"
+#       }
+#   }
+#
+# - "command" is the command line to run, "{input}" is replaced with the CNF
+#   file, and "{output}" with the file the satisfying assignment goes in.
+# - "output" is how the solver reports the assignment: "file" if it writes
+#   it to "{output}" the way minisat does, or "stdout" if it prints
+#   competition style "s SATISFIABLE" and "v ..." lines.
+# - "stats" is either the name of a preset in STATS_PRESETS, or an object of
+#   regexes with one group each, for any of "decisions", "decisionRate",
+#   "propagations", "propagationRate" and "time", matched against stdout.
+#   Rates that aren't matched are computed, stats that aren't are 0, and
+#   the time defaults to the CPU time of the solver process.
+
+DEFAULT_SOLVER = "minisat"
+
+STATS_PRESETS = {
+    "minisat": {
+        "decisions": r"decisions\s*:\s*(\d+)",
+        "decisionRate": r"decisions.*\((\d+) /sec\)",
+        "propagations": r"propagations\s*:\s*(\d+)",
+        "propagationRate": r"propagations.*\((\d+) /sec\)",
+        "time": r"CPU time\s*:\s*([\d.]+)",
+    },
+    "none": {},
+}
+
+DEFAULT_SOLVERS = {
+    DEFAULT_SOLVER: {
+        "command": ["minisat", "{input}", "{output}"],
+        "output": "file",
+        "stats": "minisat",
+    }
+}
+
+Stats = Tuple[str, str, str, str, str]
+
+
+@dataclass
+class SolverDef:
+    name: str
+    command: List[str]
+    output: str
+    stats: Dict[str, str]
+
+    # whether the solver's executable can be found
+    def available(self) -> bool:
+        return shutil.which(self.command[0]) is not None
+
+    def args(self, infile: str, outfile: str) -> List[str]:
+        return [a.format(input=infile, output=outfile) for a in self.command]
+
+    # run the solver on infile, leaving the assignment in outfile in the
+    # format minisat uses, so it can be decoded. returns the solver's stats
+    # as a result row: decisions, decision rate, propagations,
+    # propagation rate, and CPU time.
+    def run(self, infile: str, outfile: str) -> Stats:
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        proc = subprocess.run(
+            self.args(infile, outfile), stdout=subprocess.PIPE, text=True
+        )
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+        self.collect(outfile, proc.stdout)
+        return self.parse_stats(proc.stdout, cpu)
+
+    # once the solver has finished, make sure outfile holds the assignment in
+    # the format minisat uses. returns the result, SAT or UNSAT, or an empty
+    # string if the solver didn't find one (e.g. it crashed).
+    def collect(self, outfile: str, output: str) -> str:
+        if self.output == "stdout":
+            with open(outfile, "w") as out:
+                out.write(competition_to_minisat(output))
+        if not os.path.isfile(outfile):
+            return ""
+        with open(outfile, "r") as f:
+            result = f.readline().strip()
+        return result if result in ("SAT", "UNSAT") else ""
+
+    def parse_stats(self, output: str, cpu: float) -> Stats:
+        def find(key: str) -> Optional[str]:
+            match = re.search(self.stats[key], output) if key in self.stats else None
+            return match.group(1) if match else None
+
+        time = find("time") or f"{cpu:.6f}"
+        decisions = find("decisions") or "0"
+        props = find("propagations") or "0"
+
+        def rate(x: str) -> str:
+            return str(round(float(x) / float(time))) if float(time) else "0"
+
+        return (
+            decisions,
+            find("decisionRate") or rate(decisions),
+            props,
+            find("propagationRate") or rate(props),
+            time,
+        )
+
+
+# convert competition style solver output ("s ..." and "v ..." lines)
+# into the result file format minisat writes.
+def competition_to_minisat(output: str) -> str:
+    status, literals = "", []
+    for line in output.splitlines():
+        if line.startswith("s "):
+            status = line[2:].strip()
+        elif line.startswith("v "):
+            literals += line[2:].split()
+    if status == "UNSATISFIABLE":
+        return "UNSAT\n"
+    if status != "SATISFIABLE":
+        # minisat writes INDET when it gives up without an answer
+        return "INDET\n"
+    literals = [lit for lit in literals if lit != "0"]
+    return "SAT\n" + " ".join(literals) + " 0\n"
+
+
+# returns the solvers defined in config, or just minisat if none are
+def registry(config: dict) -> Dict[str, SolverDef]:
+    solvers = {}
+    for name, definition in config.get("solvers", DEFAULT_SOLVERS).items():
+        stats = definition.get("stats", "none")
+        if isinstance(stats, str):
+            if stats not in STATS_PRESETS:
+                print(f"Error: unknown stats preset {stats} for solver {name}")
+                exit(1)
+            stats = STATS_PRESETS[stats]
+        solvers[name] = SolverDef(
+            name, definition["command"], definition.get("output", "file"), stats
+        )
+    return solvers
+
+
+# the solver used when none is specified
+def default_solver(config: dict) -> str:
+    return config.get("defaultSolver", next(iter(registry(config))))
+
+
+# name of an encoding run with a solver, used for directory names and, once
+# capitalized, as labels in the reports. Only solvers other than the default
+# one are added to the name, e.g. minimal-cadical.
+def member_name(enc, solver: str, config: dict) -> str:
+    if solver == default_solver(config):
+        return enc.name.lower()
+    return f"{enc.name.lower()}-{solver}"
@@ -0,0 +1,72 @@
+import sys
+import time
+
+from satcoder.cnf import SEED_COMMENT
+from satcoder.layout import layout as get_layout
+from satcoder.solver import Solver
+
+# Stand-in SAT solver for testing satmark's solver registry without
+# installing a real solver. It only understands CNFs made by satcoder: the
+# puzzle is recovered from the positive unit clauses (the clues), solved
+# with the native solver, and the result printed competition style, with
+# "c" comment lines for the stats. CNFs in a seeded layout (sud2sat --seed)
+# are mapped back through the layout named by their "c seed" comment, and
+# the assignment is printed in the same layout. Register it in sat_config.json with:
+#
+#   "standin": {
+#       "command": ["python", "-m", "satmark.standin", "{input}"],
+#       "output": "stdout",
+#       "stats": {
+#           "decisions": "c decisions: (\\d+)",
+#           "propagations": "c propagations: (\\d+)",
+#           "time": "c time: ([\\d.]+)"
+#       }
+#   }
+
+
+def main():
+    grid = [0] * 81
+    layout = None
+    with open(sys.argv[1], "r") as f:
+        for line in f:
+            if line.startswith(SEED_COMMENT):
+                layout = get_layout(int(line[len(SEED_COMMENT) :]))
+                continue
+            literals = line.split()
+            if len(literals) == 2 and literals[1] == "0" and literals[0].isdigit():
+                var = int(literals[0])
+                var = (layout.original(var) if layout else var) - 1
+                grid[var // 9] = var % 9 + 1
+
+    solver = Solver()
+    start = time.process_time()
+    solution = solver.solve(grid)
+    elapsed = time.process_time() - start
+
+    print(f"c decisions: {solver.decisions}")
+    print(f"c propagations: {solver.propagations}")
+    print(f"c time: {elapsed:.6f}")
+    if solution is None:
+        print("s UNSATISFIABLE")
+        exit(20)
+
+    print("s SATISFIABLE")
+    literals = [
+        var if solution[(var - 1) // 9] == (var - 1) % 9 + 1 else -var
+        for var in range(1, 730)
+    ]
+    if layout:
+        # the same assignment, numbered the way the CNF was
+        literals = sorted(
+            (layout.variables[x] if x > 0 else -layout.variables[-x] for x in literals),
+            key=abs,
+        )
+    # competition output wraps the assignment over several v lines
+    for i in range(0, len(literals), 20):
+        print("v " + " ".join(map(str, literals[i : i + 20])))
+    print("v 0")
+    exit(10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from mdtable import TableMaker
+
+# Measures how long the command line tools take to start, since scripts that
+# call sud2sat once per puzzle pay for it every time. Each command is run
+# --runs times in a fresh interpreter, and the median, minimum and 90th
+# percentile wall times are reported. With -o, the results are appended to
+# a JSON lines file, and compared against the last results in it, so cold
+# start times can be tracked from one change to the next.
+
+PUZZLE = "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......"
+
+
+# the commands to time, and the input to give each on stdin
+def commands(work_dir: str) -> Dict[str, Tuple[List[str], bytes]]:
+    python = sys.executable
+    assignment = subprocess.run(
+        [python, "-m", "satmark.standin", __write(work_dir, "puzzle.cnf", PUZZLE)],
+        stdout=subprocess.PIPE,
+    ).stdout
+    return {
+        "python": ([python, "-c", "pass"], b""),
+        "import satcoder": ([python, "-c", "import satcoder"], b""),
+        "sud2sat": ([python, "-m", "satcoder.sud2sat"], PUZZLE.encode()),
+        "sat2sud": ([python, "-m", "satcoder.sat2sud"], __to_minisat(assignment)),
+        "satmark --help": ([python, "-m", "satmark.benchmark", "--help"], b""),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the startup of the CLI tools")
+    parser.add_argument(
+        "-n", "--runs", type=int, default=20, help="runs of each command (default 20)"
+    )
+    parser.add_argument(
+        "-o", "--output", default="", help="JSON lines file to append the results to"
+    )
+    args = parser.parse_args()
+
+    previous = __last_results(args.output) if args.output else {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        # run from an empty directory, so no config or cache is picked up
+        results = {
+            name: measure(cmd, stdin, args.runs, work_dir)
+            for name, (cmd, stdin) in commands(work_dir).items()
+        }
+
+    rows = []
+    for name, r in results.items():
+        before = previous.get(name, {}).get("median")
+        change = f"{(r['median'] - before) / before:+.1%}" if before else ""
+        times = (f"{r[k]:.1f}" for k in ("median", "min", "p90"))
+        rows.append((name, *times, change))
+    cols = ("Command", "Median (ms)", "Min (ms)", "P90 (ms)", "Change")
+    print(TableMaker(new_line=False).table("Startup Times", [cols] + rows))
+
+    if args.output:
+        with open(args.output, "a") as f:
+            record = {"time": time.time(), "python": sys.version.split()[0]}
+            f.write(json.dumps({**record, "results": results}) + "\n")
+
+
+# runs cmd runs times, returns the median, min and 90th percentile in ms
+def measure(cmd: List[str], stdin: bytes, runs: int, cwd: str) -> Dict[str, float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, input=stdin, stdout=subprocess.DEVNULL, cwd=cwd, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "median": round(statistics.median(times), 3),
+        "min": round(times[0], 3),
+        "p90": round(times[min(len(times) - 1, int(len(times) * 0.9))], 3),
+    }
+
+
+def __write(work_dir: str, name: str, puzzle: str) -> str:
+    from satcoder import encode
+
+    path = os.path.join(work_dir, name)
+    with open(path, "w") as f:
+        f.write(encode(puzzle))
+    return path
+
+
+# convert the stand-in solver's competition output into minisat's format
+def __to_minisat(output: bytes) -> bytes:
+    from .solvers import competition_to_minisat
+
+    return competition_to_minisat(output.decode()).encode()
+
+
+def __last_results(path: str) -> dict:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r") as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1])["results"] if lines else {}
+
+
+if __name__ == "__main__":
+    main()
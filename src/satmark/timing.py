@@ -0,0 +1,189 @@
+import os
+import platform
+import socket
+import statistics
+import time
+from typing import Dict, List, Optional
+
+# Timing hygiene, enabled with satmark -I. CPU times depend on more than the
+# solver: which core the scheduler puts it on, frequency scaling, and
+# whatever else the machine is running. With -I:
+#
+# - every process that runs solvers is pinned to a core of its own with
+#   os.sched_setaffinity, and the solvers it starts inherit the pin. With
+#   --idle-siblings only one logical CPU of each physical core is used, so
+#   the hyperthread sharing a solver's core is left idle.
+# - a fixed calibration loop is timed before each batch (a puzzle set with
+#   one encoding and solver), and compared to the same loop timed when the
+#   run started, to catch the machine slowing down part way through.
+# - every result file is stamped with a fingerprint of the machine (CPU
+#   model, frequency governor, load, kernel), the core it ran on, and the
+#   calibration, so results from different machines can be told apart.
+#
+# A batch is flagged as noisy in its results if its calibration runs varied
+# by more than NOISY_CV, if they were more than NOISY_DRIFT slower or faster
+# than at the start of the run, if the load average was more than NOISY_LOAD
+# per CPU, or if the CPU frequency governor isn't "performance".
+
+CALIBRATION_RUNS = 5
+# iterations of the calibration loop, tens of milliseconds on most machines.
+# Shorter loops are too easily thrown off by a single interruption.
+CALIBRATION_LOOP = 200_000
+NOISY_CV = 0.05
+NOISY_DRIFT = 0.10
+# load average per CPU above which the machine is overloaded, the run's own
+# workers count towards it
+NOISY_LOAD = 1.25
+
+__ENABLED = False
+__CORE: Optional[int] = None
+# the calibration when the run started, in the main process
+__BASELINE: Optional[float] = None
+
+
+# turn on timing hygiene, returns the cores to run solvers on. Calibrates
+# the baseline, so it should be called before any workers are forked.
+def enable(idle_siblings: bool = False) -> List[int]:
+    global __ENABLED, __BASELINE
+    __ENABLED = True
+    __BASELINE = calibrate()["median"]
+    return cores(idle_siblings)
+
+
+def enabled() -> bool:
+    return __ENABLED
+
+
+# the CPUs this process may run on, with only the first logical CPU of each
+# physical core if idle_siblings is set
+def cores(idle_siblings: bool = False) -> List[int]:
+    cpus = sorted(os.sched_getaffinity(0))
+    if not idle_siblings:
+        return cpus
+    kept, seen = [], set()
+    for cpu in cpus:
+        siblings = __siblings(cpu)
+        if not siblings & seen:
+            kept.append(cpu)
+        seen |= siblings | {cpu}
+    return kept
+
+
+# pin this process, and the solvers it starts from now on, to core
+def pin(core: int) -> None:
+    global __CORE
+    os.sched_setaffinity(0, {core})
+    __CORE = core
+
+
+# pool initializer, pins each worker to the next of cores, counting workers
+# with counter, a multiprocessing.Value starting at 0. A worker that
+# replaces one that exited takes the next index, so it may share a core,
+# but never waits for one.
+def pin_worker(cores: List[int], counter) -> None:
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    pin(cores[index % len(cores)])
+
+
+# times CALIBRATION_RUNS runs of the calibration loop, returns the median
+# and the coefficient of variation of the runs, in seconds
+def calibrate(runs: int = CALIBRATION_RUNS) -> Dict[str, float]:
+    # the first run warms up the interpreter and the caches, and isn't counted
+    __spin(CALIBRATION_LOOP)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        __spin(CALIBRATION_LOOP)
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    cv = statistics.stdev(times) / statistics.mean(times) if runs > 1 else 0.0
+    return {"median": round(median, 6), "cv": round(cv, 4)}
+
+
+# the fingerprint of this machine, as it is now
+def fingerprint() -> dict:
+    return {
+        "host": socket.gethostname(),
+        "cpu": __cpu_model(),
+        "cpus": os.cpu_count(),
+        "governor": __governor(),
+        "load": [round(x, 2) for x in os.getloadavg()],
+        "kernel": platform.release(),
+        "python": platform.python_version(),
+    }
+
+
+# calibrates and fingerprints the machine before a batch, returns what is
+# saved with the batch's results, or None if timing hygiene is off
+def check() -> Optional[dict]:
+    if not __ENABLED:
+        return None
+    calibration = calibrate()
+    machine = fingerprint()
+    return {
+        "machine": machine,
+        "core": __CORE,
+        "calibration": {**calibration, "baseline": __BASELINE},
+        "noisy": noise(calibration, machine),
+    }
+
+
+# the reasons a batch's times can't be trusted, if any
+def noise(calibration: Dict[str, float], machine: dict) -> List[str]:
+    reasons = []
+    if calibration["cv"] > NOISY_CV:
+        reasons.append(f"calibration runs varied by {calibration['cv']:.1%}")
+    if __BASELINE:
+        drift = calibration["median"] / __BASELINE - 1
+        if abs(drift) > NOISY_DRIFT:
+            reasons.append(f"calibration {drift:+.1%} from the start of the run")
+    if machine["load"][0] > NOISY_LOAD * (machine["cpus"] or 1):
+        reasons.append(f"load average {machine['load'][0]} on {machine['cpus']} CPUs")
+    if machine["governor"] not in ("performance", "unknown"):
+        reasons.append(f"CPU frequency governor is {machine['governor']}")
+    return reasons
+
+
+def __spin(n: int) -> int:
+    x = 0
+    for i in range(n):
+        x = (x + i * i) % 1000003
+    return x
+
+
+# the logical CPUs sharing a physical core with cpu, including it
+def __siblings(cpu: int) -> set:
+    path = f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"
+    try:
+        with open(path, "r") as f:
+            text = f.read().strip()
+    except OSError:
+        return {cpu}
+    siblings = set()
+    # e.g. "0,64" or "0-1"
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        siblings.update(range(int(first), int(last or first) + 1))
+    return siblings
+
+
+def __cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def __governor() -> str:
+    path = "/sys/devices/system/cpu/cpu0/cpufreq/scaling_governor"
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return "unknown"
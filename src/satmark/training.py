@@ -0,0 +1,59 @@
+import glob
+import json
+import os
+from typing import Dict, List, Tuple
+
+from satcoder import Encoding
+from satcoder.features import fit, vector
+
+# Trains the model `-e auto` uses to pick an encoding and solver for each
+# puzzle. The training data is the .json results of earlier runs (e.g. with
+# -a), which hold the features of every puzzle, and the time each member
+# took on it. Each puzzle is labelled with its fastest member, so only
+# members that solve CNFs (not the native solver, or auto itself) count.
+
+DEFAULT_MODEL = "encoding_model.json"
+
+
+# path of the model, from the config's "encodingModel", if set
+def model_path(config: dict) -> str:
+    return config.get("encodingModel", DEFAULT_MODEL)
+
+
+# returns the feature vectors and labels of every puzzle in directory's results
+def training_data(directory: str) -> Tuple[List[List[float]], List[str]]:
+    encodings = {enc.name.lower() for enc in Encoding}
+    best: Dict[Tuple[str, int], Tuple[float, str]] = {}
+    feats: Dict[Tuple[str, int], List[float]] = {}
+    for filename in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or "puzzles" not in data:
+            continue
+        member = data["encoding"].lower()
+        if member.split("-")[0] not in encodings:
+            continue
+        for p in data["puzzles"]:
+            if "features" not in p:
+                continue
+            key = (data["set"], p["puzzle"])
+            feats[key] = vector(p["features"])
+            if key not in best or p["time"] < best[key][0]:
+                best[key] = (p["time"], member)
+    keys = sorted(best)
+    return [feats[k] for k in keys], [best[k][1] for k in keys]
+
+
+def run_train(config, silent: bool) -> None:
+    vectors, labels = training_data(config["resultsDir"])
+    if not vectors:
+        print(f"Error: no results with puzzle features in {config['resultsDir']}")
+        exit(1)
+    model = fit(vectors, labels)
+    out = model_path(config)
+    with open(out, "w") as f:
+        json.dump(model, f)
+    if not silent:
+        for label in sorted(model["centroids"]):
+            print(f"{label.capitalize()}: fastest on {labels.count(label)} puzzles")
+        print(f"Model trained on {len(vectors)} puzzles, saved to {out}")